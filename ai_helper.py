@@ -0,0 +1,453 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from fileutil import write_json
+
+# --- AI 助学缓存 ---
+# 词源/助记/场景的分析结果按 (语言, 单词, 释义) 持久化到磁盘，所有会话共享。
+# 同一个词的并发请求只发一次（single-flight）；批量模式一次请求分析整个单元。
+# 流式模式边收边解析，每个字段一完整就交给界面显示；超时或格式有误时返回已收到的部分。
+
+MODEL_NAME = "gemini-2.5-flash-preview-09-2025"
+FIELDS = ("root", "mnemonic", "scenario", "scenario_cn")
+STREAM_TIMEOUT = 60
+_decoder = json.JSONDecoder()
+_WS = re.compile(r"[ \t\r\n]*")
+
+
+class AnalysisError(ValueError):
+    """模型的回答里一个字段都解析不出来。"""
+
+
+def build_prompt(lang_prompt, word, meaning):
+    return f"""
+        作为{lang_prompt}，请分析单词 "{word}" (含义: {meaning})。
+        请以纯 JSON 格式返回，包含字段：root (词源), mnemonic (助记), scenario (短对话), scenario_cn (翻译)。
+        """
+
+
+def build_batch_prompt(lang_prompt, items):
+    listing = json.dumps([{"word": w, "meaning": m} for w, m in items], ensure_ascii=False)
+    return f"""
+        作为{lang_prompt}，请逐个分析下面这些单词：
+        {listing}
+        请以纯 JSON 格式返回一个对象，键为单词原文，值包含字段：root (词源), mnemonic (助记), scenario (短对话), scenario_cn (翻译)。
+        """
+
+
+def build_example_prompt(lang_prompt, items):
+    """items 为 [{"id", "word", "meaning", 可选 "example"}, ...]，已有例句的只要翻译。"""
+    listing = json.dumps(items, ensure_ascii=False)
+    return f"""
+        作为{lang_prompt}，请为下面每个单词写一个简短、常用的例句，并给出中文翻译：
+        {listing}
+        已经给出 example 的单词不要改写例句，只翻译它。
+        请以纯 JSON 格式返回一个对象，键为 id，值包含字段：example (例句), example_cn (翻译)。
+        """
+
+
+def extract_json(text):
+    match = re.search(r'\{.*\}', text or "", re.DOTALL)
+    if not match:
+        return None
+    return json.loads(match.group())
+
+
+class FieldParser:
+    """增量解析模型回答里的 JSON 对象，顶层的每个键值对一完整就产出。
+
+    对象之前的代码块标记等内容会被跳过；值不完整时等下一段文本再试。
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self.done = False
+        self._pos = None    # 下一个键值对的起点；None 表示还没找到对象的 "{"
+
+    def feed(self, text):
+        """追加一段文本，返回这次新完成的 [(键, 值), ...]。"""
+        self.buffer += text
+        completed = []
+        if self._pos is None:
+            start = self.buffer.find("{")
+            if start < 0:
+                return completed
+            self._pos = start + 1
+        buf = self.buffer
+        while not self.done:
+            pos = _WS.match(buf, self._pos).end()
+            if pos < len(buf) and buf[pos] == ",":
+                pos = _WS.match(buf, pos + 1).end()
+            if pos >= len(buf):
+                break
+            if buf[pos] == "}":
+                self.done = True
+                break
+            try:
+                key, pos = _decoder.raw_decode(buf, pos)
+                pos = _WS.match(buf, pos).end()
+                if pos >= len(buf):
+                    break
+                if buf[pos] != ":":
+                    raise ValueError(f"第 {pos} 个字符处缺少冒号")
+                pos = _WS.match(buf, pos + 1).end()
+                value, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                # 字符串没闭合，或出错位置离结尾很近（如 "tr"、半个 \u 转义），说明还没收全
+                if "Unterminated" in e.msg or e.pos + 6 >= len(buf):
+                    break
+                raise
+            # 数字可能还没收完，后面出现分隔符才算完整
+            if end >= len(buf) and not isinstance(value, (str, dict, list)):
+                break
+            self._pos = end
+            if isinstance(key, str):
+                self.fields[key] = value
+                completed.append((key, value))
+        return completed
+
+
+def analysis_key(lang_code, word, meaning):
+    return hashlib.sha1(f"{lang_code}\0{word}\0{meaning}".encode("utf-8")).hexdigest()
+
+
+class GeminiBackend:
+    def __init__(self, api_key, model_name=MODEL_NAME):
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+        self.model = genai.GenerativeModel(model_name)
+        # 不用 genai.configure：它是进程级的全局配置，模型在第一次请求时才取默认客户端，
+        # 多个会话用不同的 Key 时会用上别人的 Key。这里给模型绑定只认这个 Key 的客户端。
+        self.model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+    def generate_stream(self, prompt, timeout=STREAM_TIMEOUT):
+        for chunk in self.model.generate_content(prompt, stream=True, request_options={"timeout": timeout}):
+            yield chunk.text
+
+
+class FakeModel:
+    """离线模型：根据提示词里的单词返回确定性的 JSON，记录调用次数，可模拟延迟。
+
+    流式输出时 delay 是首块之前的等待，之后按 chunk_size 个字符切块，块与块之间等待 chunk_delay 秒。
+    """
+
+    def __init__(self, delay=0.0, chunk_size=16, chunk_delay=0.0):
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def example(item):
+        example = item.get("example") or f"{item['word']} 的例句。"
+        return {"example": example, "example_cn": f"（{item['meaning']}）的例句翻译"}
+
+    @staticmethod
+    def answer(word):
+        return {"root": f"{word} 的词源", "mnemonic": f"{word} 的助记",
+                "scenario": f"A: {word}? B: {word}.", "scenario_cn": f"A：{word}？B：{word}。"}
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return self._reply(prompt)
+
+    def _reply(self, prompt):
+        batch = re.search(r'\[\{.*\}\]', prompt, re.DOTALL)
+        if batch:
+            items = json.loads(batch.group())
+            if items and "id" in items[0]:
+                return json.dumps({str(item["id"]): self.example(item) for item in items}, ensure_ascii=False)
+            return json.dumps({item["word"]: self.answer(item["word"]) for item in items}, ensure_ascii=False)
+        word = re.search(r'单词 "(.*?)"', prompt).group(1)
+        return "```json\n" + json.dumps(self.answer(word), ensure_ascii=False) + "\n```"
+
+    def generate_stream(self, prompt, timeout=STREAM_TIMEOUT):
+        with self._lock:
+            self.calls += 1
+        text = self._reply(prompt)
+        if self.delay:
+            time.sleep(self.delay)
+        for i in range(0, len(text), self.chunk_size):
+            if i and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield text[i:i + self.chunk_size]
+
+
+def _pump(chunks, out):
+    # 在后台线程里读流，主线程按截止时间从队列取，卡住的连接不会拖住界面
+    try:
+        for chunk in chunks:
+            out.put(("chunk", chunk))
+    except Exception as e:
+        out.put(("error", e))
+    else:
+        out.put(("end", None))
+
+
+def stream_fields(backend, prompt, timeout=STREAM_TIMEOUT, on_field=None):
+    """流式请求并增量解析，返回 (字段 dict, 是否超时)。
+
+    每解析出一个字段调用一次 on_field(键, 值)。流出错时已收到的字段照样返回，一个也没有才抛出异常。
+    """
+    parser = FieldParser()
+    out = queue.Queue()
+    threading.Thread(target=_pump, args=(backend.generate_stream(prompt, timeout=timeout), out),
+                     name="ai-stream", daemon=True).start()
+    deadline = time.monotonic() + timeout
+    timed_out = False
+    while not parser.done:
+        remaining = deadline - time.monotonic()
+        try:
+            kind, item = out.get(timeout=max(remaining, 0))
+        except queue.Empty:
+            timed_out = True
+            break
+        if kind == "end":
+            break
+        if kind == "error":
+            if not parser.fields:
+                raise item
+            break
+        try:
+            completed = parser.feed(item)
+        except ValueError:
+            break
+        for key, value in completed:
+            if on_field:
+                on_field(key, value)
+    if not parser.fields and not timed_out:
+        # 流式解析失败时再按旧办法整体找一次 JSON 对象
+        try:
+            result = extract_json(parser.buffer)
+        except ValueError:
+            result = None
+        if not isinstance(result, dict):
+            raise AnalysisError(f"模型回答无法解析: {parser.buffer[:80]!r}")
+        for key, value in result.items():
+            if on_field:
+                on_field(key, value)
+        return result, False
+    return parser.fields, timed_out
+
+
+class AnalysisCache:
+    def __init__(self, directory, max_memory_entries=4096):
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.partial = 0
+        self.timeouts = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> Future，正在请求中的词
+        self._inflight = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        with self._lock:
+            self._remember(key, result)
+        return result
+
+    def get(self, lang_code, word, meaning):
+        result = self._lookup(analysis_key(lang_code, word, meaning))
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+        return result
+
+    def put(self, lang_code, word, meaning, result):
+        key = analysis_key(lang_code, word, meaning)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_json(path, result)
+        with self._lock:
+            self._remember(key, result)
+
+    def _claim(self, keys):
+        """为尚未在请求中的 key 登记 Future；返回 (自己负责的, 需要等待的)。"""
+        owned, waiting = {}, {}
+        with self._lock:
+            for key in keys:
+                if key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                else:
+                    owned[key] = self._inflight[key] = Future()
+        return owned, waiting
+
+    def _release(self, key, result=None, error=None):
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is None:
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def analyze(self, backend, lang_code, lang_prompt, word, meaning, timeout=120):
+        cached = self.get(lang_code, word, meaning)
+        if cached is not None:
+            return cached
+        key = analysis_key(lang_code, word, meaning)
+        owned, waiting = self._claim([key])
+        if waiting:
+            return waiting[key].result(timeout=timeout)
+        try:
+            # 拿到请求权之前可能已有别人写入缓存
+            result = self._lookup(key)
+            if result is None:
+                with self._lock:
+                    self.misses += 1
+                    self.requests += 1
+                result = extract_json(backend.generate(build_prompt(lang_prompt, word, meaning)))
+                if result is not None:
+                    self.put(lang_code, word, meaning, result)
+            self._release(key, result)
+        except Exception as e:
+            self._release(key, error=e)
+            raise
+        finally:
+            # KeyboardInterrupt 等非 Exception 的中断也要放掉请求权（已放掉时什么都不做）
+            self._release(key)
+        return result
+
+    def analyze_stream(self, backend, lang_code, lang_prompt, word, meaning, on_field=None,
+                       timeout=STREAM_TIMEOUT):
+        """流式版 analyze：字段一解析出来就回调 on_field(键, 值)。
+
+        四个字段齐全才写入缓存；超时或回答残缺时返回已有的部分（不缓存）。
+        """
+        cached = self.get(lang_code, word, meaning)
+        if cached is None:
+            key = analysis_key(lang_code, word, meaning)
+            owned, waiting = self._claim([key])
+            if waiting:
+                cached = waiting[key].result(timeout=timeout)
+            else:
+                cached = self._lookup(key)
+                if cached is None:
+                    return self._stream_owned(key, backend, lang_code, lang_prompt, word, meaning,
+                                              on_field, timeout)
+                self._release(key, cached)
+        if cached is not None and on_field:
+            for field in FIELDS:
+                if field in cached:
+                    on_field(field, cached[field])
+        return cached
+
+    def _stream_owned(self, key, backend, lang_code, lang_prompt, word, meaning, on_field, timeout):
+        with self._lock:
+            self.misses += 1
+            self.requests += 1
+        ui_failed = []
+
+        def notify(field, value):
+            try:
+                on_field(field, value)
+            except BaseException:
+                ui_failed.append(True)
+                raise
+
+        try:
+            result, timed_out = stream_fields(backend, build_prompt(lang_prompt, word, meaning), timeout,
+                                              notify if on_field else None)
+            complete = all(field in result for field in FIELDS)
+            if complete:
+                self.put(lang_code, word, meaning, result)
+            else:
+                with self._lock:
+                    self.partial += 1
+                    self.timeouts += timed_out
+            # 残缺结果不交给等待中的请求，它们拿到 None 后可以自己重试
+            self._release(key, result if complete else None)
+        except Exception as e:
+            # 界面回调自己的错误不交给等待中的请求
+            self._release(key, error=None if ui_failed else e)
+            raise
+        finally:
+            # 界面回调里 Streamlit 的重跑/停止不是 Exception，同样要放掉请求权，等待者拿到 None 后自己重试
+            self._release(key)
+        return result
+
+    def analyze_batch(self, backend, lang_code, lang_prompt, items, timeout=300):
+        """items 为 [(单词, 释义), ...]；未缓存的词合并成一次请求。返回 {单词: 结果}。"""
+        results = {}
+        missing = []
+        for word, meaning in items:
+            cached = self.get(lang_code, word, meaning)
+            if cached is not None:
+                results[word] = cached
+            elif (word, meaning) not in missing:
+                missing.append((word, meaning))
+        if not missing:
+            return results
+
+        keys = {analysis_key(lang_code, w, m): (w, m) for w, m in missing}
+        owned, waiting = self._claim(keys)
+        try:
+            if owned:
+                todo = [keys[k] for k in owned]
+                with self._lock:
+                    self.misses += len(todo)
+                    self.requests += 1
+                parsed = extract_json(backend.generate(build_batch_prompt(lang_prompt, todo))) or {}
+                for key in owned:
+                    word, meaning = keys[key]
+                    result = parsed.get(word)
+                    if isinstance(result, dict):
+                        self.put(lang_code, word, meaning, result)
+                        results[word] = result
+                    self._release(key, results.get(word))
+        except Exception as e:
+            for key in owned:
+                self._release(key, error=e)
+            raise
+        finally:
+            for key in owned:
+                self._release(key)
+        for key, future in waiting.items():
+            result = future.result(timeout=timeout)
+            if result is not None:
+                results[keys[key][0]] = result
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {"memory_entries": len(self._memory), "hits": self.hits,
+                    "misses": self.misses, "requests": self.requests, "partial": self.partial,
+                    "timeouts": self.timeouts, "inflight": len(self._inflight)}
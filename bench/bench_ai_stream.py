@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_helper import AnalysisCache, FakeModel, build_prompt
+from bench_quiz import percentile
+
+# --- AI 助学首屏延迟基准 ---
+# 用离线的流式 FakeModel 对比整体返回（analyze）和流式解析（analyze_stream）：
+# 整体返回要等全部内容到齐才有东西可显示，流式在第一个字段完整时就能显示。
+# 用法：python bench/bench_ai_stream.py [--requests 20] [--delay 0.5] [--chunk-size 16] [--chunk-delay 0.02]
+
+
+def run(mode, model, requests):
+    cache = AnalysisCache(tempfile.mkdtemp(prefix="bench_ai_"))
+    first, total = [], []
+    for n in range(requests):
+        seen = []
+        t = time.perf_counter()
+        if mode == "blocking":
+            cache.analyze(model, "ko", "韩语老师", f"단어{n}", "词")
+            seen.append(time.perf_counter() - t)
+        else:
+            cache.analyze_stream(model, "ko", "韩语老师", f"단어{n}", "词",
+                                 on_field=lambda key, value: seen.append(time.perf_counter() - t))
+        total.append(time.perf_counter() - t)
+        first.append(seen[0])
+    return first, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI 助学从点击到首个字段显示的延迟")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.5, help="模型首块之前的等待（秒）")
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="两块之间的等待（秒）")
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<10} {'first p50 ms':>13} {'first p95 ms':>13} {'total p50 ms':>13}")
+    for mode in ("blocking", "stream"):
+        model = FakeModel(args.delay, args.chunk_size, args.chunk_delay)
+        if mode == "blocking":
+            # 整体返回的耗时等于流式全部块到齐的耗时
+            chunks = -(-len(model._reply(build_prompt("韩语老师", "단어0", "词"))) // args.chunk_size)
+            model.delay = args.delay + args.chunk_delay * (chunks - 1)
+        first, total = run(mode, model, args.requests)
+        print(f"{mode:<10} {percentile(first, 0.5) * 1e3:>13.1f} {percentile(first, 0.95) * 1e3:>13.1f} "
+              f"{percentile(total, 0.5) * 1e3:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
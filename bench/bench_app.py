@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ai_helper
+import tts_cache
+from bench_quiz import percentile
+from deck_cache import DeckCache, load_book
+
+# --- 整页重跑延迟基准 ---
+# 用 Streamlit 的 AppTest 无界面驱动 streamlit_app.py，发音和 Gemini 换成离线替身，
+# 对每本词库测量常见操作（翻卡、上/下一张、选 1/50/全部单元、练习作答、切换书）
+# 触发的整次重跑耗时，输出 p50/p95、单次重跑的 Python 堆峰值和进程峰值内存。
+# 结果写成 JSON，可以用 --baseline 与另一次提交的结果对比。
+# 用法：python bench/bench_app.py [--repeats 20] [--output result.json] [--baseline old.json] [words_ko.json ...]
+
+APP = os.path.join(ROOT, "streamlit_app.py")
+DEMO_BOOK = "默认演示词库"
+QUIZ_MODE = "⚔️ 强化练习"
+CARD_MODE = "📖 卡片学习"
+
+
+def _button(at, label=None, prefix=None, key_prefix=None):
+    for b in at.button:
+        if (label is not None and b.label == label) or (prefix is not None and b.label.startswith(prefix)) \
+                or (key_prefix is not None and (b.key or "").startswith(key_prefix)):
+            return b
+    raise LookupError(f"找不到按钮 {label or prefix or key_prefix}")
+
+
+def _check(at):
+    if at.exception:
+        raise RuntimeError(f"应用报错: {at.exception[0].message}")
+
+
+class Bench:
+    def __init__(self, repeats, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.repeats = repeats
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        self.at.run()
+        _check(self.at)
+
+    def timed(self, action):
+        """执行一次操作并计时整次重跑（含按钮回调里的 st.rerun）。"""
+        t = time.perf_counter()
+        action().run()
+        elapsed = time.perf_counter() - t
+        _check(self.at)
+        return elapsed
+
+    def measure(self, name, action, reset=None):
+        samples = []
+        for _ in range(self.repeats):
+            samples.append(self.timed(action))
+            if reset:
+                reset().run()
+                _check(self.at)
+        # 另跑一次带 tracemalloc 的，记录单次重跑的堆峰值（不计入延迟）
+        tracemalloc.start()
+        try:
+            action().run()
+            _check(self.at)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        if reset:
+            reset().run()
+        return {"scenario": name, "runs": len(samples),
+                "p50_ms": round(percentile(samples, 0.5) * 1e3, 2),
+                "p95_ms": round(percentile(samples, 0.95) * 1e3, 2),
+                "max_ms": round(max(samples) * 1e3, 2),
+                "mean_ms": round(sum(samples) / len(samples) * 1e3, 2),
+                "peak_heap_kb": round(peak / 1024, 1)}
+
+    def open_book(self, lang, book):
+        at = self.at
+        at.selectbox(key="lang_select").set_value(lang).run()
+        at.selectbox(key="book_select").set_value(book).run()
+        at.radio[0].set_value(CARD_MODE).run()
+        _check(at)
+
+    def units(self):
+        return self.at.sidebar.multiselect[0]
+
+    def run_book(self, lang, book, other):
+        at = self.at
+        self.open_book(lang, book)
+        rows = []
+        rows.append(self.measure("flip", lambda: _button(at, prefix="🔄").click(),
+                                 reset=lambda: _button(at, prefix="↩️").click()))
+        rows.append(self.measure("next", lambda: _button(at, label="❯").click()))
+        rows.append(self.measure("prev", lambda: _button(at, label="❮").click()))
+        names = self.units().options
+        for label, n in (("units_1", 1), ("units_50", 50), ("units_all", len(names))):
+            n = min(n, len(names))
+            # 在两组同样大小的选择之间来回切换；全选时两组相同，测的是全选状态下的重跑
+            pair = [names[:n], names[-n:]]
+            state = {"i": 0}
+
+            def select(pair=pair, state=state):
+                state["i"] ^= 1
+                return self.units().set_value(pair[state["i"]])
+            rows.append(self.measure(label, select))
+        self.units().set_value(names[:50]).run()
+        at.radio[0].set_value(QUIZ_MODE).run()
+        _check(at)
+        rows.append(self.measure("quiz_answer", lambda: _button(at, key_prefix="quiz_opt_").click(),
+                                 reset=lambda: _button(at, label="➡️ 下一题").click()))
+        at.radio[0].set_value(CARD_MODE).run()
+        if other:
+            # 同语言有别的书就切书，否则切到另一种语言（书随之切换）
+            key = "book_select" if other[0] == lang else "lang_select"
+            values = [other[1] if key == "book_select" else other[0], book if key == "book_select" else lang]
+            state = {"i": 0}
+
+            def switch():
+                state["i"] ^= 1
+                return at.selectbox(key=key).set_value(values[state["i"] ^ 1])
+            row = self.measure("book_switch", switch)
+            row["via"] = key
+            rows.append(row)
+            self.open_book(lang, book)
+        return rows
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["book"], r["scenario"]): r for r in baseline["results"]}
+    print(f"\n对比 {baseline_path}（{baseline.get('commit')}）")
+    print(f"{'book':<28} {'scenario':<12} {'p50 ms':>16} {'p95 ms':>16}")
+    for r in results:
+        o = old.get((r["book"], r["scenario"]))
+        if o is None:
+            continue
+        cells = []
+        for field in ("p50_ms", "p95_ms"):
+            delta = (r[field] - o[field]) / o[field] * 100 if o[field] else 0.0
+            cells.append(f"{r[field]:>7.1f} ({delta:+5.0f}%)")
+        print(f"{r['book']:<28} {r['scenario']:<12} {cells[0]:>16} {cells[1]:>16}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用 AppTest 测量 streamlit_app.py 各种操作的重跑延迟")
+    parser.add_argument("books", nargs="*", help="只测这些词库（文件名），默认全部")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="结果 JSON 的输出路径")
+    parser.add_argument("--baseline", help="与之前保存的结果 JSON 对比")
+    args = parser.parse_args(argv)
+
+    # 缓存、进度库都放到临时目录，不碰工作区里的数据；发音和 AI 走离线替身
+    scratch = tempfile.mkdtemp(prefix="bench_app_")
+    for name, sub in (("AUDIO_CACHE_DIR", "audio"), ("AI_CACHE_DIR", "ai"), ("DECK_DIR", "decks"),
+                      ("PDF_UPLOAD_DIR", "pdf"), ("PROGRESS_DB", "progress.sqlite3"),
+                      ("CATALOG_PATH", "catalog.json")):
+        os.environ[name] = os.path.join(scratch, sub)
+    tts_cache.GTTSBackend = tts_cache.StubBackend
+    ai_helper.GeminiBackend = lambda api_key: ai_helper.FakeModel()
+    os.chdir(ROOT)
+
+    bench = Bench(args.repeats, args.timeout)
+    at = bench.at
+    plan = []
+    for lang in at.selectbox(key="lang_select").options:
+        at.selectbox(key="lang_select").set_value(lang).run()
+        # 选项显示的是带词数的标签，逐个选中后读出真实路径
+        for k in range(len(at.selectbox(key="book_select").options)):
+            book = at.selectbox(key="book_select").select_index(k).run().selectbox(key="book_select").value
+            if book != DEMO_BOOK and (not args.books or book in args.books):
+                plan.append((lang, book))
+
+    results = []
+    print(f"{'book':<28} {'cards':>6} {'scenario':<12} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'heap KB':>9}")
+    for lang, book in plan:
+        same_lang = [(l, b) for l, b in plan if l == lang and b != book]
+        other_lang = [(l, b) for l, b in plan if l != lang]
+        other = (same_lang or other_lang or [None])[0]
+        deck = load_book(DeckCache(), book)
+        entries = deck.merge_report.entries_in if deck.merge_report else len(deck)
+        for row in bench.run_book(lang, book, other):
+            row = dict(book=book, entries=entries, **row)
+            results.append(row)
+            print(f"{book:<28} {entries:>6} {row['scenario']:<12} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                  f"{row['max_ms']:>8.1f} {row['peak_heap_kb']:>9.0f}")
+
+    report = {"commit": _git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "python": platform.python_version(), "streamlit": __import__("streamlit").__version__,
+              "repeats": args.repeats, "peak_rss_mb": round(_peak_rss_mb(), 1), "results": results}
+    print(f"进程峰值内存 {report['peak_rss_mb']} MB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        _compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
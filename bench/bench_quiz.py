@@ -0,0 +1,74 @@
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deck_cache import DeckCache, load_book
+from quiz import DistractorIndex
+
+# --- 出题延迟基准 ---
+# 对比旧的线性扫描选干扰项与 DistractorIndex，在全部单元被选中时的每题耗时。
+# 用法：python bench/bench_quiz.py [--questions 2000] [words_ko.json ...]
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def linear_scan(view, i, rng):
+    # 原 init_quiz_options 的做法：每题把整个选择范围扫一遍
+    word = view.word_at(i)
+    other = [j for j, w in enumerate(view.iter_words()) if w != word]
+    return [view[j] for j in rng.sample(other, 3)]
+
+
+def indexed(index, view, i, rng):
+    answer, unit = view.locate(i)
+    return [index.deck.card(p) for p in index.pick(answer, unit, 3, rng)]
+
+
+def run(book, questions, rng):
+    deck = load_book(DeckCache(), book)
+    view = deck.select(deck.unit_names)
+    t = time.perf_counter()
+    index = DistractorIndex(deck)
+    build = time.perf_counter() - t
+    order = [rng.randrange(len(view)) for _ in range(questions)]
+    rows = {}
+    for name, fn in (("linear", lambda i: linear_scan(view, i, rng)),
+                     ("indexed", lambda i: indexed(index, view, i, rng))):
+        samples = []
+        for i in order[:questions if name == "indexed" else min(questions, 200)]:
+            t = time.perf_counter()
+            fn(i)
+            samples.append(time.perf_counter() - t)
+        rows[name] = samples
+    return len(view), build, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="干扰项选择的每题延迟")
+    parser.add_argument("books", nargs="*")
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    books = args.books or sorted(glob.glob(os.path.join(root, "words*.json")))
+    rng = random.Random(args.seed)
+    print(f"{'book':<32} {'cards':>6} {'build ms':>9} {'mode':>8} {'p50 us':>9} {'p95 us':>9} {'max us':>9}")
+    for book in books:
+        cards, build, rows = run(book, args.questions, rng)
+        for mode, samples in rows.items():
+            print(f"{os.path.basename(book):<32} {cards:>6} {build * 1e3:>9.1f} {mode:>8} "
+                  f"{percentile(samples, 0.5) * 1e6:>9.1f} {percentile(samples, 0.95) * 1e6:>9.1f} "
+                  f"{max(samples) * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
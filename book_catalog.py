@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+
+from deck_binary import compile_book, load_compiled
+from deck_cache import load_book_keyed
+from fileutil import write_json
+
+# --- 书目清单 ---
+# 记录目录里每本词库的词条数、单元数、不同单词数和内容哈希，持久化成清单文件。
+# 侧边栏直接读清单；轮询时只 stat 目录和已知的书，目录 mtime 变了才重新列目录，
+# 只有新增或改写过的书才会被解析；开启 compile_decks 时顺便把它编译成可 mmap 的 .deck。
+
+MANIFEST_VERSION = 1
+POLL_INTERVAL = 2.0
+# PDF 导入的中间文件不是词库
+SKIP_SUFFIXES = (".ckpt.json",)
+
+
+class BookInfo:
+    __slots__ = ("path", "size", "mtime_ns", "sha1", "entries", "units", "distinct", "error")
+
+    def __init__(self, path, size, mtime_ns, sha1=None, entries=0, units=0, distinct=0, error=None):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.sha1 = sha1
+        self.entries = entries      # 去重前的词条数
+        self.units = units
+        self.distinct = distinct    # 去重后的不同单词数
+        self.error = error
+
+    def matches(self, stat):
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+
+    def label(self):
+        if self.error:
+            return f"{self.path}（无法解析）"
+        return f"{self.path} · {self.distinct} 词"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+
+class Catalog:
+    def __init__(self, deck_cache, directory=".", prefixes=("words_",), manifest_path=None,
+                 poll_interval=POLL_INTERVAL, compile_decks=False):
+        self.deck_cache = deck_cache
+        self.directory = directory
+        self.prefixes = tuple(prefixes)
+        self.manifest_path = manifest_path
+        self.poll_interval = poll_interval
+        self.compile_decks = compile_decks
+        self.scans = 0
+        self.parsed = 0
+        self._books = {}
+        self._dir_mtime = None
+        self._last_poll = None
+        self._lock = threading.Lock()
+        self._load_manifest()
+
+    def _load_manifest(self):
+        if not self.manifest_path:
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if manifest.get("version") != MANIFEST_VERSION:
+            return
+        # 清单里的书先全部信任，下一次轮询时再用 stat 校验
+        for item in manifest.get("books", []):
+            info = BookInfo.from_dict(item)
+            self._books[info.path] = info
+
+    def _save_manifest(self):
+        if not self.manifest_path:
+            return
+        manifest = {"version": MANIFEST_VERSION,
+                    "books": [info.to_dict() for _, info in sorted(self._books.items())]}
+        write_json(self.manifest_path, manifest, indent=1)
+
+    def _wanted(self, name):
+        return (name.endswith(".json") and name.startswith(self.prefixes)
+                and not name.endswith(SKIP_SUFFIXES))
+
+    def _path(self, name):
+        return os.path.normpath(os.path.join(self.directory, name))
+
+    def _scan(self):
+        self.scans += 1
+        stats = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if self._wanted(entry.name) and entry.is_file():
+                    stats[self._path(entry.name)] = entry.stat()
+        return stats
+
+    def _stat_known(self):
+        stats = {}
+        for path in self._books:
+            try:
+                stats[path] = os.stat(path)
+            except FileNotFoundError:
+                pass
+        return stats
+
+    def _describe(self, path, stat):
+        self.parsed += 1
+        try:
+            (_, digest), deck = load_book_keyed(self.deck_cache, path)
+        except Exception as e:
+            # 一本坏书只在侧边栏标成“无法解析”，不能影响其他书
+            return BookInfo(path, stat.st_size, stat.st_mtime_ns, error=str(e) or type(e).__name__)
+        if self.compile_decks and load_compiled(path, stat.st_size, stat.st_mtime_ns) is None:
+            try:
+                compile_book(path)
+            except (OSError, ValueError):
+                # 编译不了（如含有额外字段）就继续用 JSON
+                pass
+        report = deck.merge_report
+        entries = report.entries_in if report else len(deck)
+        return BookInfo(path, stat.st_size, stat.st_mtime_ns, digest, entries, len(deck.unit_names), len(deck))
+
+    def refresh(self, force=False):
+        """轮询目录，返回新增、改动或删除的书；距上次轮询不足 poll_interval 时直接返回。"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_poll is not None and now - self._last_poll < self.poll_interval:
+                return []
+            self._last_poll = now
+            dir_mtime = os.stat(self.directory).st_mtime_ns
+            # 增删文件会改变目录 mtime；原地改写只会改变文件本身的 mtime
+            rescan = force or dir_mtime != self._dir_mtime
+            stats = self._scan() if rescan else self._stat_known()
+            changed = [path for path in self._books if path not in stats]
+            for path in changed:
+                del self._books[path]
+            for path, stat in stats.items():
+                info = self._books.get(path)
+                if info is None or not info.matches(stat):
+                    self._books[path] = self._describe(path, stat)
+                    changed.append(path)
+            # 整个目录都处理完才记下 mtime，中途出错时下次轮询会重新列目录
+            if rescan:
+                self._dir_mtime = dir_mtime
+            if changed:
+                self._save_manifest()
+            return changed
+
+    def books(self, prefix=""):
+        """清单中以 prefix 开头的书，按文件名排序。"""
+        with self._lock:
+            return [info for path, info in sorted(self._books.items())
+                    if os.path.basename(path).startswith(prefix)]
+
+    def get(self, path):
+        with self._lock:
+            return self._books.get(path)
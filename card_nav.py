@@ -0,0 +1,71 @@
+import base64
+import hashlib
+import os
+
+import streamlit.components.v1 as components
+
+# --- 浏览器端翻卡组件 ---
+# 一次把当前单元的全部卡片（已缓存的发音以 data URI 附带）发给前端，
+# 翻面、上/下一张、练习作答都在浏览器里完成；位置、自评和作答结果攒成一批再回传，
+# 每批只触发一次服务器重跑。走出当前单元时立即回传，服务器再发下一个单元。
+# 卡片和音频只在 cards_key 变化（换单元、又有发音生成好）时才发送，其余重跑只带很小的状态。
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "card_nav")
+# 浏览器朗读兜底用的语言标签
+SPEECH_LANGS = {"ko": "ko-KR", "th": "th-TH", "ja": "ja-JP", "fr": "fr-FR"}
+FLUSH_EVENTS = 8
+FLUSH_IDLE_MS = 1500
+
+_component = components.declare_component("card_nav", path=FRONTEND_DIR)
+
+
+def _audio_uri(data):
+    return "data:audio/mpeg;base64," + base64.b64encode(data).decode("ascii")
+
+
+def _cards(view, start, stop, audio_lookup, quiz_options):
+    cards = []
+    for i in range(start, stop):
+        card = view[i]
+        item = {"word": card["word"], "meaning": card["meaning"],
+                "example": card.get("example") or "", "example_cn": card.get("example_cn") or ""}
+        audio = audio_lookup(card["word"]) if audio_lookup else None
+        if audio:
+            item["audio"] = _audio_uri(audio)
+        if quiz_options is not None:
+            item["options"], item["answer"] = quiz_options(i)
+        cards.append(item)
+    return cards
+
+
+def build_payload(view, index, mode, lang_code, label, seq=0, score=0, flipped=False,
+                  audio_lookup=None, quiz_options=None, grades=None, audio_ready=None, sent_key=None):
+    """当前单元的状态；cards_key 与 sent_key（上次发给前端的）不同时才附带卡片，否则 cards 为 None。
+
+    audio_lookup(text) 只查缓存，返回 bytes 或 None；audio_ready(text) 只判断缓存里有没有；
+    quiz_options(i) 返回视图下标 i 的 4 个选项释义和正确项下标。
+    """
+    start, stop, unit = view.unit_span(index)
+    # 同一单元、同一模式的 token 不变，前端据此决定是否沿用本地位置
+    token = hashlib.sha1(f"{mode}:{unit}:{start}:{stop}:{len(view)}".encode("utf-8")).hexdigest()[:12]
+    ready = "".join("1" if audio_ready(view.word_at(i)) else "0" for i in range(start, stop)) if audio_ready else ""
+    cards_key = f"{token}:{hashlib.sha1(ready.encode('ascii')).hexdigest()[:8]}"
+    cards = None if cards_key == sent_key else _cards(view, start, stop, audio_lookup, quiz_options)
+    return {"token": token, "cards_key": cards_key, "mode": mode, "unit": unit, "start": start,
+            "total": len(view), "position": index - start, "flipped": bool(flipped), "seq": seq, "score": score,
+            "label": label, "speech_lang": SPEECH_LANGS.get(lang_code, lang_code), "cards": cards,
+            "grades": grades or {}, "flush_events": FLUSH_EVENTS, "flush_idle_ms": FLUSH_IDLE_MS}
+
+
+def card_nav(payload, key="card_nav"):
+    """渲染组件，返回前端最近一次回传的批次（可能是 None）。"""
+    return _component(payload=payload, key=key, default=None)
+
+
+def new_batch(value, last_seq):
+    """组件返回值里还没处理过的批次；没有新批次时返回 None。"""
+    if not isinstance(value, dict) or not isinstance(value.get("seq"), int):
+        return None
+    if value["seq"] <= last_seq:
+        return None
+    return value
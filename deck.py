@@ -0,0 +1,207 @@
+import random
+import sys
+from array import array
+from bisect import bisect_right
+
+# --- 紧凑的列式词库 ---
+# 每本书只构建一次：单词/释义/例句/例句翻译各占一列（字符串已驻留），
+# 单元用偏移数组 + 成员数组（CSR）索引，去重后一个词条可以属于多个单元。
+# 选择单元只返回区间视图，不再逐条复制 dict；同样的选择复用同一个视图，
+# 所以选一个单元和选全部单元的开销一样。同一个词在多个所选单元里只出一次卡。
+
+CHUNK_SIZE = 20
+VIEW_CACHE_SIZE = 8
+FIELDS = ("word", "meaning", "example", "example_cn")
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Deck:
+    __slots__ = ("words", "meanings", "examples", "examples_cn", "unit_names", "unit_offsets",
+                 "unit_members", "merge_report", "load_report", "_unit_pos", "_views", "__weakref__")
+
+    def __init__(self, words, meanings, examples, examples_cn, unit_names, unit_offsets, unit_members=None):
+        self.words = words
+        self.meanings = meanings
+        self.examples = examples
+        self.examples_cn = examples_cn
+        self.unit_names = unit_names
+        # unit_members[unit_offsets[k]:unit_offsets[k + 1]] 是第 k 个单元的词条下标
+        self.unit_offsets = unit_offsets
+        if unit_members is None:
+            unit_members = array("I", range(len(words)))
+        self.unit_members = unit_members
+        self.merge_report = None
+        self.load_report = None
+        self._unit_pos = {name: k for k, name in enumerate(unit_names)}
+        self._views = {}
+
+    @classmethod
+    def from_raw(cls, raw_data, chunk_size=CHUNK_SIZE):
+        """列表按每 chunk_size 个词切成单元；dict 视为 {单元名: [词条]}。"""
+        if isinstance(raw_data, list):
+            total = len(raw_data)
+            units = []
+            for i in range(0, total, chunk_size):
+                name = f"单元 {i//chunk_size + 1} ({i+1}-{min(i+chunk_size, total)})"
+                units.append((name, raw_data[i:i + chunk_size]))
+        elif isinstance(raw_data, dict):
+            units = list(raw_data.items())
+        else:
+            raise ValueError("数据结构无法识别")
+
+        columns = ([], [], [], [])
+        unit_names = []
+        unit_offsets = array("I", [0])
+        for name, items in units:
+            if not isinstance(items, list):
+                raise ValueError(f"单元 {name} 不是词条列表")
+            for item in items:
+                if not isinstance(item, dict):
+                    raise ValueError(f"单元 {name} 里有不是对象的词条")
+                for column, field in zip(columns, FIELDS):
+                    column.append(_intern(item.get(field, "")))
+            unit_names.append(str(name))
+            unit_offsets.append(len(columns[0]))
+        return cls(*columns, unit_names, unit_offsets)
+
+    def __len__(self):
+        return len(self.words)
+
+    def nbytes(self):
+        """内存占用估算：各列、单元索引和字符串本身；驻留后共用的字符串只算一次。"""
+        seen = set()
+        total = sys.getsizeof(self.unit_offsets) + sys.getsizeof(self.unit_members) + sys.getsizeof(self.unit_names)
+        for column in (self.words, self.meanings, self.examples, self.examples_cn, self.unit_names):
+            total += sys.getsizeof(column)
+            for value in column:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    total += sys.getsizeof(value)
+        return total
+
+    def unit_range(self, name):
+        """单元在 unit_members 中的区间。"""
+        k = self._unit_pos[name]
+        return range(self.unit_offsets[k], self.unit_offsets[k + 1])
+
+    def unit_entries(self, name):
+        r = self.unit_range(name)
+        return self.unit_members[r.start:r.stop]
+
+    def card(self, i, unit=None):
+        item = {"word": self.words[i], "meaning": self.meanings[i],
+                "example": self.examples[i], "example_cn": self.examples_cn[i]}
+        if unit is not None:
+            item["source_unit"] = unit
+        return item
+
+    def select(self, unit_names):
+        """所选单元的视图；最近用过的几种选择会被复用。"""
+        key = tuple(unit_names)
+        view = self._views.get(key)
+        if view is None:
+            view = DeckView(self, key)
+            if len(self._views) >= VIEW_CACHE_SIZE:
+                self._views.pop(next(iter(self._views)), None)
+            self._views[key] = view
+        return view
+
+
+class DeckView:
+    """所选单元的只读视图：只保存区间，按需生成当前卡片。
+
+    长度是 O(1)；按下标取卡先看上一次命中的单元，顺序翻卡时是 O(1)，跳转时二分单元起点。
+    """
+
+    __slots__ = ("deck", "units", "key", "ranges", "_starts", "_stops", "_length", "_hint")
+
+    def __init__(self, deck, unit_names):
+        self.deck = deck
+        self.units = list(unit_names)
+        # 可哈希的选择标识，用作复习队列、预取等的缓存键
+        self.key = tuple(self.units)
+        # 每个单元在 unit_members 中的下标：通常就是单元区间；
+        # 同一个词在多个所选单元里出现时只留第一次，后面的单元改存剩下的下标
+        self.ranges = []
+        members = deck.unit_members
+        seen = set()
+        for name in self.units:
+            r = deck.unit_range(name)
+            if seen:
+                keep = [j for j in r if members[j] not in seen]
+                if len(keep) < len(r):
+                    r = array("I", keep)
+            if len(self.units) > 1:
+                seen.update(members[j] for j in r)
+            self.ranges.append(r)
+        self._starts = []
+        self._stops = []
+        total = 0
+        for r in self.ranges:
+            self._starts.append(total)
+            total += len(r)
+            self._stops.append(total)
+        self._length = total
+        self._hint = 0
+
+    def __len__(self):
+        return self._length
+
+    def locate(self, i):
+        """视图下标 -> (词库下标, 单元名)。"""
+        if i < 0:
+            i += self._length
+        k = self._slot(i)
+        return self.deck.unit_members[self.ranges[k][i - self._starts[k]]], self.units[k]
+
+    def _slot(self, i):
+        """视图下标 i 所在的单元序号。"""
+        if not 0 <= i < self._length:
+            raise IndexError("DeckView index out of range")
+        k = self._hint
+        if not self._starts[k] <= i < self._stops[k]:
+            # 视图可能被多个会话共用，_hint 只是提示，读到旧值也只是多一次二分
+            k = self._hint = bisect_right(self._starts, i) - 1
+        return k
+
+    def __getitem__(self, i):
+        pos, unit = self.locate(i)
+        return self.deck.card(pos, unit)
+
+    def unit_span(self, i):
+        """视图下标 i 所在单元在视图中的区间 [start, stop) 和单元名。"""
+        k = self._slot(i)
+        return self._starts[k], self._stops[k], self.units[k]
+
+    def __iter__(self):
+        members = self.deck.unit_members
+        for unit, r in zip(self.units, self.ranges):
+            for pos in r:
+                yield self.deck.card(members[pos], unit)
+
+    def sample(self, k, rng=random, exclude=None):
+        """不放回地随机抽 k 个视图下标（不足时全部返回），不生成完整列表。"""
+        n = self._length - (exclude is not None and 0 <= exclude < self._length)
+        picked = rng.sample(range(n), min(k, n))
+        if exclude is not None:
+            # 抽样区间里去掉了 exclude，之后的下标整体后移一位
+            picked = [i + (i >= exclude) for i in picked]
+        return picked
+
+    def word_at(self, i):
+        return self.deck.words[self.locate(i)[0]]
+
+    def iter_words(self):
+        words = self.deck.words
+        for pos in self.positions():
+            yield words[pos]
+
+    def positions(self):
+        """依次产出所选单元的词条下标（跨单元可能重复）。"""
+        members = self.deck.unit_members
+        for r in self.ranges:
+            for pos in r:
+                yield members[pos]
@@ -0,0 +1,264 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from deck import FIELDS, Deck
+from dedupe import MergeReport, dedupe_deck
+from fileutil import atomic_open
+
+# --- 二进制词库 ---
+# 把 words_*.json 预编译成 .deck 文件：字符串表 + 每列定长的字符串编号数组 + 单元索引。
+# 应用用 mmap 打开，卡片按需解码，打开一本书只读文件头和单元名，与词条数无关；
+# 多个进程打开同一个文件时共享操作系统的页缓存。
+# 文件里同时保存原始词条（含 null 和缺失字段），能无损还原源 JSON；字段按 FIELDS 顺序输出，
+# 仓库里的词库可以逐字节还原。
+#
+# 布局（小端）：文件头 | 字符串偏移 | 原始词条 | 原始单元偏移 | 去重后各列 | 单元偏移 | 单元成员 | 单元名 | 字符串数据
+
+MAGIC = b"KSDECK\x00\x01"
+# 去重规则变化时加一，旧的 .deck 会被忽略并重新编译
+VERSION = 2
+HEADER = struct.Struct("<8sIIQQ20s5I8Q")
+NULL = 0xFFFFFFFF       # JSON null
+MISSING = 0xFFFFFFFE    # 原始词条里没有这个字段
+FLAG_UNITS = 1          # 源文件顶层是 {单元名: [词条]}
+SUFFIX = ".deck"
+
+
+def compiled_path(path):
+    """words_ko.json -> .decks/words_ko.deck（目录可用 DECK_DIR 覆盖）。"""
+    directory = os.environ.get("DECK_DIR") or os.path.join(os.path.dirname(path), ".decks")
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(directory, stem + SUFFIX)
+
+
+def _u32(values):
+    data = array("I", values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tobytes()
+
+
+def _pad(n):
+    return -n % 8
+
+
+class _Strings:
+    def __init__(self):
+        self.ids = {}
+        self.blob = bytearray()
+        self.offsets = [0]
+
+    def add(self, text):
+        if text is None:
+            return NULL
+        sid = self.ids.get(text)
+        if sid is None:
+            sid = self.ids[text] = len(self.offsets) - 1
+            self.blob += text.encode("utf-8")
+            self.offsets.append(len(self.blob))
+        return sid
+
+
+def _raw_units(raw):
+    if isinstance(raw, list):
+        return [(None, raw)], 0
+    if isinstance(raw, dict):
+        return list(raw.items()), FLAG_UNITS
+    raise ValueError("数据结构无法识别")
+
+
+def compile_book(path, out_path=None):
+    """编译一本 JSON 词库，返回输出路径。源文件里有 schema 之外的内容时拒绝编译。"""
+    out_path = out_path or compiled_path(path)
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    raw = json.loads(data.decode("utf-8"))
+    units, flags = _raw_units(raw)
+    source = Deck.from_raw(raw)
+    deck = dedupe_deck(source)
+
+    strings = _Strings()
+    raw_ids = []
+    for name, items in units:
+        if not isinstance(items, list):
+            raise ValueError(f"单元 {name} 不是词条列表")
+        for item in items:
+            if not isinstance(item, dict) or not set(item) <= set(FIELDS):
+                raise ValueError(f"词条含有无法无损编译的字段: {item!r}"[:200])
+            for field in FIELDS:
+                value = item.get(field, MISSING)
+                if value is not MISSING and value is not None and not isinstance(value, str):
+                    raise ValueError(f"字段 {field} 不是字符串: {value!r}"[:200])
+                raw_ids.append(MISSING if value is MISSING else strings.add(value))
+    columns = [strings.add(text) for column in (deck.words, deck.meanings, deck.examples, deck.examples_cn)
+               for text in column]
+    unit_name_ids = [strings.add(name) for name in deck.unit_names]
+
+    # 去重不改变单元划分，原始词条沿用去重前的单元偏移
+    sections = [_u32(strings.offsets), _u32(raw_ids), _u32(source.unit_offsets), _u32(columns),
+                _u32(deck.unit_offsets), _u32(deck.unit_members), _u32(unit_name_ids), bytes(strings.blob)]
+    offsets = []
+    pos = HEADER.size
+    for section in sections[:-1]:
+        offsets.append(pos)
+        pos += len(section) + _pad(len(section))
+    offsets.append(pos)
+    header = HEADER.pack(MAGIC, VERSION, flags, stat.st_size, stat.st_mtime_ns, hashlib.sha1(data).digest(),
+                         len(raw_ids) // len(FIELDS), len(deck), len(deck.unit_names), len(deck.unit_members),
+                         len(strings.offsets) - 1, *offsets)
+
+    directory = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(directory, exist_ok=True)
+    with atomic_open(out_path, "wb") as f:
+        f.write(header)
+        for section in sections:
+            f.write(section)
+            f.write(b"\0" * _pad(len(section)))
+    return out_path
+
+
+class StringColumn:
+    """mmap 上的一列字符串，按下标解码；行为上等同于 Deck 的 list 列。"""
+
+    __slots__ = ("_ids", "_offsets", "_blob")
+
+    def __init__(self, ids, offsets, blob):
+        self._ids = ids
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _string(self, sid):
+        if sid >= MISSING:
+            return None
+        return str(self._blob[self._offsets[sid]:self._offsets[sid + 1]], "utf-8")
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._string(sid) for sid in self._ids[i]]
+        return self._string(self._ids[i])
+
+    def __iter__(self):
+        for sid in self._ids:
+            yield self._string(sid)
+
+
+class CompiledBook:
+    def __init__(self, deck_file):
+        with open(deck_file, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self._mmap)
+        (magic, version, self.flags, self.source_size, self.source_mtime_ns, digest,
+         self.raw_count, self.count, units, members, strings, *offsets) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是可识别的二进制词库: {deck_file}")
+        self.sha1 = digest.hex()
+        view = memoryview(self._mmap)
+        str_off, raw_off, raw_units_off, col_off, unit_off, member_off, names_off, blob_off = offsets
+
+        def u32(start, n):
+            values = view[start:start + 4 * n].cast("I")
+            if sys.byteorder == "big":
+                values = array("I", values)
+                values.byteswap()
+            return values
+
+        self._offsets = u32(str_off, strings + 1)
+        self._blob = view[blob_off:]
+        self._raw = u32(raw_off, self.raw_count * len(FIELDS))
+        self._raw_units = u32(raw_units_off, units + 1)
+        self._columns = [u32(col_off + 4 * self.count * k, self.count) for k in range(len(FIELDS))]
+        self._unit_offsets = u32(unit_off, units + 1)
+        self._unit_members = u32(member_off, members)
+        self._unit_names = StringColumn(u32(names_off, units), self._offsets, self._blob)
+
+    def is_current(self, size, mtime_ns):
+        return self.source_size == size and self.source_mtime_ns == mtime_ns
+
+    def deck(self):
+        """按需解码的 Deck；只有单元名会立即读出。"""
+        columns = [StringColumn(ids, self._offsets, self._blob) for ids in self._columns]
+        deck = Deck(*columns, list(self._unit_names), self._unit_offsets, self._unit_members)
+        # 合并明细没有保存，只保留数量；需要明细时对源 JSON 运行 dedupe.py
+        deck.merge_report = MergeReport(self.raw_count, self.count, [])
+        return deck
+
+    def to_raw(self):
+        """还原源 JSON 的数据结构。"""
+        strings = StringColumn(self._raw, self._offsets, self._blob)
+        names = self._unit_names
+        units = []
+        for k in range(len(self._raw_units) - 1):
+            items = []
+            for i in range(self._raw_units[k], self._raw_units[k + 1]):
+                base = i * len(FIELDS)
+                items.append({field: strings[base + j] for j, field in enumerate(FIELDS)
+                              if self._raw[base + j] != MISSING})
+            units.append((names[k], items))
+        if self.flags & FLAG_UNITS:
+            return dict(units)
+        return [item for _, items in units for item in items]
+
+
+def load_compiled(path, size, mtime_ns):
+    """源文件对应的 .deck 存在且与 (大小, mtime) 一致时返回 CompiledBook，否则返回 None。"""
+    try:
+        book = CompiledBook(compiled_path(path))
+    except (OSError, ValueError, struct.error):
+        return None
+    return book if book.is_current(size, mtime_ns) else None
+
+
+def dumps_book(raw):
+    # 与仓库里现有词库相同的格式
+    return json.dumps(raw, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把 words_*.json 编译成可 mmap 的二进制词库，或还原回 JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("compile", help="编译词库，默认输出到同目录的 .decks/")
+    p.add_argument("books", nargs="+")
+    p.add_argument("--verify", action="store_true", help="编译后逐字节比对还原结果")
+    p = sub.add_parser("decompile", help="把 .deck 还原成 JSON")
+    p.add_argument("deck")
+    p.add_argument("-o", "--output", help="输出文件，默认打印到标准输出")
+    args = parser.parse_args(argv)
+
+    if args.command == "decompile":
+        text = dumps_book(CompiledBook(args.deck).to_raw())
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            print(text)
+        return 0
+    failed = 0
+    for path in args.books:
+        try:
+            out_path = compile_book(path)
+        except (OSError, ValueError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        line = f"{path} -> {out_path} ({os.path.getsize(out_path)} 字节)"
+        if args.verify:
+            with open(path, "r", encoding="utf-8") as f:
+                same = f.read() == dumps_book(CompiledBook(out_path).to_raw())
+            line += "  还原一致" if same else "  还原不一致!"
+            failed += not same
+        print(line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
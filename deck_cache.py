@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from deck import Deck
+from deck_binary import load_compiled
+from dedupe import dedupe_deck
+from upload_loader import load_stream
+
+# --- 词库共享缓存 ---
+# Streamlit 每次点击都会重跑整个脚本，这里把解析后的词库放进进程级缓存，
+# 所有会话共用，翻卡/切换单词时不再重复读取和解析 JSON。缓存的是构建好并去重后的 Deck。
+# 缓存按内容哈希存放：内容相同的两个文件（如 words_ko.json 与 words-ko.json）只加载一次。
+
+MAX_ALIASES = 4096
+
+
+def book_key(path):
+    """本地词库的路径键：绝对路径 + mtime + 大小，文件被改写后自动失效。"""
+    stat = os.stat(path)
+    return ("file", os.path.abspath(path), stat.st_mtime_ns, stat.st_size), stat.st_size
+
+
+def content_key(data):
+    """内容键：本地文件和上传文件共用，字节相同即视为同一本书。"""
+    return ("sha1", hashlib.sha1(data).hexdigest()), len(data)
+
+
+class DeckCache:
+    """线程安全的 LRU 缓存，按词库在内存中的估算大小计算占用，超过上限时淘汰最久未使用的词库。"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        # 路径键 -> 内容键，stat 未变时无需重新读文件计算哈希
+        self._aliases = {}
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+        return None
+
+    def get_or_load(self, key, loader, size=None):
+        """size 缺省时加载后按 Deck.nbytes() 估算。"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        # 同一个词库只解析一次：并发会话等待第一个加载者的结果
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            value = self.get(key)
+            if value is not None:
+                return value
+            try:
+                value = loader()
+                if size is None:
+                    size = value.nbytes()
+                with self._lock:
+                    self.misses += 1
+                    self._store(key, value, size)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+        return value
+
+    def _store(self, key, value, size):
+        if key in self._items:
+            self.current_bytes -= self._items.pop(key)[1]
+        self._items[key] = (value, size)
+        self.current_bytes += size
+        # 至少保留刚放入的这一项，即使它本身超过上限
+        while self.current_bytes > self.max_bytes and len(self._items) > 1:
+            _, (_, old_size) = self._items.popitem(last=False)
+            self.current_bytes -= old_size
+
+    def resolve(self, path_key):
+        with self._lock:
+            return self._aliases.get(path_key)
+
+    def add_alias(self, path_key, key):
+        with self._lock:
+            if len(self._aliases) >= MAX_ALIASES:
+                self._aliases.clear()
+            self._aliases[path_key] = key
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._aliases.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self.current_bytes,
+                    "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+
+def build_deck(data):
+    return dedupe_deck(Deck.from_raw(json.loads(data.decode("utf-8"))))
+
+
+def load_book(cache, path):
+    return load_book_keyed(cache, path)[1]
+
+
+def load_book_keyed(cache, path):
+    """返回 (内容键, Deck)，书目清单用内容键记录每本书的哈希。"""
+    path_key, _ = book_key(path)
+    key = cache.resolve(path_key)
+    if key is not None:
+        deck = cache.get(key)
+        if deck is not None:
+            return key, deck
+    # 有与源文件一致的 .deck 时直接 mmap，不读取和解析 JSON
+    compiled = load_compiled(path, path_key[3], path_key[2])
+    if compiled is not None:
+        key = ("sha1", compiled.sha1)
+        cache.add_alias(path_key, key)
+        # 列按需从 mmap 解码，占用就是映射的文件大小
+        return key, cache.get_or_load(key, compiled.deck, compiled.size)
+    with open(path, "rb") as f:
+        data = f.read()
+    key, _ = content_key(data)
+    cache.add_alias(path_key, key)
+    return key, cache.get_or_load(key, lambda: build_deck(data))
+
+
+def stream_key(stream, chunk=1 << 20):
+    """content_key 的流式版本：从头分块计算哈希，读完后回到开头。"""
+    h = hashlib.sha1()
+    size = 0
+    stream.seek(0)
+    for block in iter(lambda: stream.read(chunk), b""):
+        h.update(block)
+        size += len(block)
+    stream.seek(0)
+    return ("sha1", h.hexdigest()), size
+
+
+def build_upload(stream):
+    deck = load_stream(stream)
+    report = deck.load_report
+    deck = dedupe_deck(deck)
+    deck.load_report = report
+    return deck
+
+
+def load_upload(cache, stream):
+    """上传的文件对象按块哈希、流式解析，不整体读成 bytes 或 dict 列表。"""
+    key, _ = stream_key(stream)
+    return cache.get_or_load(key, lambda: build_upload(stream))
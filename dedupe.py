@@ -0,0 +1,116 @@
+import argparse
+import json
+import sys
+import unicodedata
+from array import array
+
+from deck import Deck
+from quiz import split_meaning
+
+# --- 词条去重 ---
+# 同一个词在书里反复出现（words_ko.json 1 万条里只有约 3.5 千个不同的词）。
+# 按规范化后的单词做哈希合并：释义、例句取并集，单元归属保持不变。
+# 释义按义项合并，拆分和判重与练习模式的 meaning_parts 一致（“；”“/”“，”等都算分隔）。
+# 全程只用 dict 查找，整体线性时间。
+
+MEANING_SEP = "；"
+EXAMPLE_SEP = "\n"
+
+
+def normalize_word(word):
+    """合并用的键：NFKC + 去首尾空白 + 合并连续空白 + casefold。"""
+    if not isinstance(word, str):
+        return word
+    return " ".join(unicodedata.normalize("NFKC", word).split()).casefold()
+
+
+class MergeReport:
+    def __init__(self, entries_in, entries_out, merged):
+        self.entries_in = entries_in
+        self.entries_out = entries_out
+        # [(单词, 出现次数, [所在单元...]), ...]，只记录真正发生合并的词
+        self.merged = merged
+
+    @property
+    def removed(self):
+        return self.entries_in - self.entries_out
+
+    def to_dict(self):
+        return {"entries_in": self.entries_in, "entries_out": self.entries_out,
+                "removed": self.removed,
+                "merged": [{"word": w, "count": n, "units": u} for w, n, u in self.merged]}
+
+
+def dedupe_deck(deck):
+    """返回合并后的新 Deck，merge_report 记录合并明细。"""
+    index = {}
+    words = []
+    meanings = []
+    examples = []
+    counts = []
+    units_of = []
+
+    new_offsets = array("I", [0])
+    new_members = array("I")
+    for unit in deck.unit_names:
+        in_unit = set()
+        for pos in deck.unit_entries(unit):
+            word = deck.words[pos]
+            key = normalize_word(word)
+            target = index.get(key)
+            if target is None:
+                target = len(words)
+                index[key] = target
+                words.append(word)
+                meanings.append(({}, []))
+                examples.append(({}, [], []))
+                counts.append(0)
+                units_of.append([])
+            counts[target] += 1
+            seen, values = meanings[target]
+            for key, part in split_meaning(deck.meanings[pos]):
+                if key not in seen:
+                    seen[key] = None
+                    values.append(part)
+            seen, origins, trans = examples[target]
+            origin = deck.examples[pos]
+            if origin and isinstance(origin, str) and origin.strip() and origin not in seen:
+                seen[origin] = None
+                origins.append(origin)
+                trans.append(deck.examples_cn[pos] or "")
+            if target not in in_unit:
+                in_unit.add(target)
+                new_members.append(target)
+                units_of[target].append(unit)
+        new_offsets.append(len(new_members))
+
+    merged_meanings = [sys.intern(MEANING_SEP.join(values)) for _, values in meanings]
+    merged_examples = [sys.intern(EXAMPLE_SEP.join(o)) if o else "" for _, o, _ in examples]
+    merged_trans = [sys.intern(EXAMPLE_SEP.join(t)) if any(t) else "" for _, _, t in examples]
+    result = Deck(words, merged_meanings, merged_examples, merged_trans,
+                  list(deck.unit_names), new_offsets, new_members)
+    merged = [(words[i], counts[i], units_of[i]) for i in range(len(words)) if counts[i] > 1]
+    result.merge_report = MergeReport(len(deck), len(words), merged)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="统计词库中的重复词条并输出合并报告")
+    parser.add_argument("book", help="words_*.json 词库文件")
+    parser.add_argument("--top", type=int, default=20, help="列出合并次数最多的前 N 个词")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出完整报告")
+    args = parser.parse_args(argv)
+
+    with open(args.book, "r", encoding="utf-8") as f:
+        deck = dedupe_deck(Deck.from_raw(json.load(f)))
+    report = deck.merge_report
+    if args.json:
+        json.dump(report.to_dict(), sys.stdout, ensure_ascii=False, indent=2)
+        return
+    print(f"{args.book}: {report.entries_in} 条 -> {report.entries_out} 条（合并 {report.removed} 条重复）")
+    for word, count, units in sorted(report.merged, key=lambda m: -m[1])[:args.top]:
+        print(f"  {word}  x{count}  {', '.join(units[:3])}{' ...' if len(units) > 3 else ''}")
+
+
+if __name__ == "__main__":
+    main()
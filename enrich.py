@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ai_helper import FakeModel, GeminiBackend, build_example_prompt, extract_json
+from fileutil import file_digest, write_json
+
+# --- 例句批量补全 ---
+# 遍历一本词库，把缺少 example / example_cn 的词条按组发给模型补全，写成一本新的词库。
+# 同一个 (单词, 释义, 已有例句) 只请求一次，结果用到它的所有词条上；已有例句和翻译的词条不请求。
+# 并发请求数有上限，请求速率受限；每组结果追加到 .part 文件并记录检查点，
+# 中断后重跑同样的命令会跳过已完成的词，失败的组在下次运行时重试。
+
+LANG_PROMPTS = {"ko": "资深的韩语老师", "th": "资深的泰语老师", "ja": "资深的日语老师", "fr": "资深的法语老师"}
+DEFAULT_BATCH = 20
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 30       # 每分钟最多发起的请求数
+BOOK_LANG = re.compile(r"^words_([a-z]{2})(?:[_.]|$)")
+
+
+def _blank(value):
+    return not isinstance(value, str) or not value.strip()
+
+
+def needs_example(item):
+    return _blank(item.get("example")) or _blank(item.get("example_cn"))
+
+
+def book_items(raw):
+    """源 JSON 里的全部词条（保持原对象，补全时原地修改）。"""
+    if isinstance(raw, list):
+        return [item for item in raw if isinstance(item, dict)]
+    if isinstance(raw, dict):
+        return [item for items in raw.values() if isinstance(items, list)
+                for item in items if isinstance(item, dict)]
+    raise ValueError("数据结构无法识别")
+
+
+def entry_key(item):
+    """(单词, 释义, 已有例句)；例句不同的词条要的翻译不同，不能共用一个结果。"""
+    example = item.get("example")
+    return (str(item.get("word") or ""), str(item.get("meaning") or ""), "" if _blank(example) else example)
+
+
+def pending_keys(items, done):
+    """需要补全、且还没有结果的 entry_key，按首次出现的顺序去重。"""
+    keys = {}
+    for item in items:
+        key = entry_key(item)
+        if key[0] and key not in done and needs_example(item):
+            keys[key] = None
+    return list(keys)
+
+
+def apply_examples(items, done):
+    """把结果填进缺失的字段，返回改动的词条数；已有的例句不覆盖。"""
+    changed = 0
+    for item in items:
+        result = done.get(entry_key(item))
+        if not result:
+            continue
+        filled = False
+        for field in ("example", "example_cn"):
+            if _blank(item.get(field)) and not _blank(result.get(field)):
+                item[field] = result[field]
+                filled = True
+        changed += filled
+    return changed
+
+
+class RateLimiter:
+    """相邻两次请求的发起时间至少相隔 60 / per_minute 秒，多线程共用。"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def request_examples(backend, limiter, lang_prompt, group):
+    """线程池任务：一组 [(单词, 释义, 已有例句), ...]，返回 {(单词, 释义, 已有例句): 结果}。"""
+    items = []
+    for n, (word, meaning, example) in enumerate(group):
+        item = {"id": n, "word": word, "meaning": meaning}
+        if example:
+            item["example"] = example
+        items.append(item)
+    limiter.wait()
+    parsed = extract_json(backend.generate(build_example_prompt(lang_prompt, items)))
+    results = {}
+    for n, key in enumerate(group):
+        value = parsed.get(str(n)) if isinstance(parsed, dict) else None
+        if isinstance(value, dict) and not _blank(value.get("example_cn")):
+            example_text = key[2] or value.get("example")
+            if not _blank(example_text):
+                results[key] = {"example": example_text, "example_cn": value["example_cn"]}
+    return results
+
+
+class EnrichStats:
+    def __init__(self, words_total, words_done):
+        self.words_total = words_total
+        self.words_done = words_done
+        self.requests = 0
+        self.failed = 0         # 没拿到可用结果的词
+        self.entries_filled = 0
+        self.last_error = None  # 最近一次失败请求的原因，交给调用方显示
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {"words_done": self.words_done, "words_total": self.words_total, "requests": self.requests,
+                "failed": self.failed, "entries_filled": self.entries_filled,
+                "last_error": self.last_error, "elapsed_s": round(self.elapsed, 2)}
+
+
+def _load_part(part_path, ckpt_path, digest):
+    """读回检查点之前完成的结果，返回 ({(单词, 释义, 已有例句): 结果}, 有效字节数)。"""
+    done = {}
+    try:
+        with open(ckpt_path, "r", encoding="utf-8") as f:
+            ckpt = json.load(f)
+    except (OSError, ValueError):
+        return done, 0
+    if ckpt.get("source") != digest or not os.path.exists(part_path):
+        return done, 0
+    part_bytes = ckpt["part_bytes"]
+    with open(part_path, "rb") as f:
+        for line in f.read(part_bytes).splitlines():
+            if line.strip():
+                row = json.loads(line)
+                key = (row["word"], row["meaning"], row.get("given", ""))
+                done[key] = {"example": row["example"], "example_cn": row["example_cn"]}
+    return done, part_bytes
+
+
+def enrich(book_path, out_path, backend, lang_prompt, batch=DEFAULT_BATCH, workers=DEFAULT_WORKERS,
+           per_minute=DEFAULT_RATE, limit=None, on_progress=None):
+    """补全 book_path 里缺失的例句，写到 out_path，返回 EnrichStats。同一输出路径上的中断任务会自动续跑。"""
+    with open(book_path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    items = book_items(raw)
+
+    part_path = out_path + ".part"
+    ckpt_path = out_path + ".ckpt.json"
+    digest = file_digest(book_path)
+    done, part_bytes = _load_part(part_path, ckpt_path, digest)
+    pending = pending_keys(items, done)
+    if limit is not None:
+        pending = pending[:limit]
+    stats = EnrichStats(len(done) + len(pending), len(done))
+    groups = iter([pending[i:i + batch] for i in range(0, len(pending), batch)])
+    limiter = RateLimiter(per_minute)
+    max_inflight = workers * 2
+
+    with open(part_path, "ab") as part:
+        # 丢弃检查点之后写了一半的数据
+        part.truncate(part_bytes)
+        part.seek(part_bytes)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrich") as pool:
+            inflight = {}
+
+            def refill():
+                while len(inflight) < max_inflight:
+                    group = next(groups, None)
+                    if group is None:
+                        return
+                    inflight[pool.submit(request_examples, backend, limiter, lang_prompt, group)] = group
+
+            refill()
+            while inflight:
+                finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    group = inflight.pop(future)
+                    stats.requests += 1
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        # 这一组不记入检查点，下次运行时重试
+                        stats.failed += len(group)
+                        stats.last_error = f"{type(e).__name__}: {e}"
+                        if on_progress:
+                            on_progress(stats)
+                        continue
+                    stats.failed += len(group) - len(results)
+                    for (word, meaning, given), result in results.items():
+                        done[(word, meaning, given)] = result
+                        row = dict(word=word, meaning=meaning, given=given, **result)
+                        part.write((json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8"))
+                    part.flush()
+                    os.fsync(part.fileno())
+                    stats.words_done += len(results)
+                    write_json(ckpt_path, {"source": digest, "part_bytes": part.tell()})
+                    if on_progress:
+                        on_progress(stats)
+                refill()
+
+    stats.entries_filled = apply_examples(items, done)
+    # 与仓库里现有词库相同的格式
+    write_json(out_path, raw, indent=2)
+    # 全部完成才清掉检查点；有失败的词时保留，重跑只补剩下的
+    if not stats.failed and limit is None:
+        os.remove(part_path)
+        os.remove(ckpt_path)
+    return stats
+
+
+def output_name(book_path):
+    stem, ext = os.path.splitext(book_path)
+    return f"{stem}_enriched{ext}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用模型批量补全词库里缺失的例句和例句翻译，输出一本新的词库")
+    parser.add_argument("book")
+    parser.add_argument("-o", "--output", help="输出路径，默认是 <书名>_enriched.json")
+    parser.add_argument("--lang", choices=sorted(LANG_PROMPTS), help="默认从文件名 words_<lang>_* 推断")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="每次请求包含的单词数")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="同时进行的请求数")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="每分钟最多发起的请求数，0 表示不限")
+    parser.add_argument("--limit", type=int, help="本次最多补全多少个词")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"))
+    parser.add_argument("--fake", action="store_true", help="用离线的 FakeModel 代替 Gemini")
+    parser.add_argument("--fake-delay", type=float, default=0.0, help="FakeModel 每次请求的延迟（秒）")
+    args = parser.parse_args(argv)
+
+    lang = args.lang
+    if lang is None:
+        match = BOOK_LANG.match(os.path.basename(args.book))
+        if not match or match.group(1) not in LANG_PROMPTS:
+            parser.error("无法从文件名推断语言，请指定 --lang")
+        lang = match.group(1)
+    if args.fake:
+        backend = FakeModel(delay=args.fake_delay)
+    elif args.api_key:
+        backend = GeminiBackend(args.api_key)
+    else:
+        parser.error("请用 --api-key 或 GEMINI_API_KEY 提供 Key，或用 --fake 离线运行")
+    out_path = args.output or output_name(args.book)
+
+    shown = [None]
+
+    def report(stats):
+        s = stats.as_dict()
+        if s["last_error"] != shown[0]:
+            shown[0] = s["last_error"]
+            print(f"\n请求失败: {s['last_error']}", file=sys.stderr)
+        print(f"\r{s['words_done']}/{s['words_total']} 词  {s['requests']} 次请求  失败 {s['failed']}  "
+              f"{s['elapsed_s']} 秒", end="", file=sys.stderr)
+
+    stats = enrich(args.book, out_path, backend, LANG_PROMPTS[lang], batch=args.batch, workers=args.workers,
+                   per_minute=args.rate, limit=args.limit, on_progress=report)
+    print(file=sys.stderr)
+    print(json.dumps(dict(stats.as_dict(), output=out_path), ensure_ascii=False))
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
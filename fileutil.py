@@ -0,0 +1,45 @@
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+# --- 文件工具 ---
+# 缓存、清单、检查点和编译产物都用同一种原子写入：先写同目录下的临时文件再 os.replace，
+# 其他会话或进程不会读到半个文件；写入出错时删掉临时文件，原文件保持不变。
+
+
+@contextmanager
+def atomic_open(path, mode="w"):
+    """打开 path 的临时替身（文本模式为 UTF-8），with 块正常结束才替换到 path。"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write(path, data):
+    """原子写入 bytes 或 str。"""
+    with atomic_open(path, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+
+
+def write_json(path, data, indent=None):
+    with atomic_open(path) as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+
+
+def file_digest(path, chunk=1 << 20):
+    """文件内容的 SHA-1，按块读取。"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
@@ -0,0 +1,270 @@
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fileutil import atomic_write
+
+# --- 运行指标 ---
+# 每次重跑的各个阶段、每次外部调用（发音、Gemini）的耗时记进直方图，
+# 各个缓存的命中/未命中在导出时从它们的 stats() 读取，平时不额外计数。
+# 导出为 Prometheus 文本格式：定期写文件，或起一个只读的 HTTP 端口。
+# 记录一次耗时只是一次 perf_counter、一次二分和一把锁，开销在微秒级。
+
+NAMESPACE = "koreastudy"
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# stats() 里这些键是只增不减的计数，其余按瞬时值导出
+COUNTER_KEYS = frozenset(("hits", "misses", "requests", "evictions", "partial", "timeouts"))
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q):
+        """按桶估计分位数（取所在桶的上界），没有数据时返回 None。"""
+        counts, _, count = self.snapshot()
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            seen += n
+            if seen >= rank:
+                return bound if bound != float("inf") else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class Counter:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Timer:
+    """既可以 with 使用，也可以手动 stop()，用于跨越大段脚本的阶段。"""
+
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.started = time.perf_counter()
+
+    def stop(self):
+        elapsed = time.perf_counter() - self.started
+        self.histogram.observe(elapsed)
+        return elapsed
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+class Registry:
+    def __init__(self, namespace=NAMESPACE):
+        self.namespace = namespace
+        self._metrics = {}      # (类型, 名字, 标签) -> 指标
+        self._help = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help, labels, factory):
+        key = (kind, name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = factory()
+                    if help:
+                        self._help.setdefault(name, help)
+        return metric
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get("histogram", name, help, labels, lambda: Histogram(buckets))
+
+    def counter(self, name, help="", **labels):
+        return self._get("counter", name, help, labels, Counter)
+
+    def timer(self, name, help="", **labels):
+        return Timer(self.histogram(name, help, **labels))
+
+    def add_collector(self, name, stats_fn):
+        """导出时调用 stats_fn()，其中的数值按 <名字>_<键> 导出。"""
+        with self._lock:
+            self._collectors[name] = stats_fn
+
+    def render(self):
+        """Prometheus 文本格式。"""
+        ns = self.namespace
+        lines = []
+        typed = set()
+        with self._lock:
+            metrics = sorted(self._metrics.items(), key=lambda item: (item[0][1], item[0][2]))
+            collectors = sorted(self._collectors.items())
+        for (kind, name, labels), metric in metrics:
+            full = f"{ns}_{name}"
+            if full not in typed:
+                typed.add(full)
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} {kind}")
+            if kind == "counter":
+                lines.append(f"{full}{_label_text(labels)} {metric.value}")
+                continue
+            counts, total, count = metric.snapshot()
+            cumulative = 0
+            for bound, n in zip(metric.buckets + (float("inf"),), counts):
+                cumulative += n
+                lines.append(f"{full}_bucket{_label_text(labels + (('le', _number(bound)),))} {cumulative}")
+            lines.append(f"{full}_sum{_label_text(labels)} {_number(total)}")
+            lines.append(f"{full}_count{_label_text(labels)} {count}")
+        for name, stats_fn in collectors:
+            try:
+                stats = stats_fn()
+            except Exception:
+                continue
+            for key, value in sorted(stats.items()):
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                kind = "counter" if key in COUNTER_KEYS else "gauge"
+                full = f"{ns}_{name}_{key}" + ("_total" if kind == "counter" else "")
+                lines.append(f"# TYPE {full} {kind}")
+                lines.append(f"{full} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        atomic_write(path, self.render())
+
+    def rows(self):
+        """调试面板用：每个直方图一行。"""
+        with self._lock:
+            metrics = sorted(self._metrics.items(), key=lambda item: (item[0][1], item[0][2]))
+        rows = []
+        for (kind, name, labels), metric in metrics:
+            if kind != "histogram":
+                continue
+            _, total, count = metric.snapshot()
+            if not count:
+                continue
+            p50, p95 = metric.quantile(0.5), metric.quantile(0.95)
+            rows.append({"指标": name + _label_text(labels), "次数": count,
+                         "平均 ms": round(total / count * 1e3, 2),
+                         "p50 ≤ ms": round(p50 * 1e3, 1), "p95 ≤ ms": round(p95 * 1e3, 1)})
+        return rows
+
+    def start_file_exporter(self, path, interval=15.0):
+        def run():
+            while True:
+                try:
+                    self.write(path)
+                except OSError:
+                    pass
+                time.sleep(interval)
+        thread = threading.Thread(target=run, name="metrics-file", daemon=True)
+        thread.start()
+        return thread
+
+    def start_http_server(self, port, host="127.0.0.1"):
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+class Timed:
+    """给后端的方法计时、记录失败次数，其余属性原样转发。
+
+    method 可以是一个方法名或一组方法名；返回迭代器（流式）的方法计到迭代结束为止。
+    """
+
+    def __init__(self, target, method, call, registry):
+        self._target = target
+        self._methods = (method,) if isinstance(method, str) else tuple(method)
+        self._histogram = registry.histogram("external_call_seconds", "外部调用耗时", call=call)
+        self._errors = registry.counter("external_call_errors_total", "外部调用失败次数", call=call)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name not in self._methods:
+            return attr
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception:
+                self._errors.inc()
+                self._histogram.observe(time.perf_counter() - started)
+                raise
+            if hasattr(result, "__next__"):
+                return self._iterate(result, started)
+            self._histogram.observe(time.perf_counter() - started)
+            return result
+        return timed
+
+    def _iterate(self, chunks, started):
+        try:
+            yield from chunks
+        except Exception:
+            self._errors.inc()
+            raise
+        finally:
+            self._histogram.observe(time.perf_counter() - started)
@@ -0,0 +1,291 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from fileutil import atomic_open, file_digest, write_json
+
+# --- PDF 教材导入 ---
+# 逐页读取教材 PDF，在进程池里抽取“单词 / 释义 / 例句”候选行，
+# 按页序写成与现有 words_<语言>_*.json 相同的格式。
+# 中间结果按批追加到 .part 文件并记录检查点，中断后可从下一页继续；
+# 同时在途的批次数有上限，内存占用与 PDF 页数无关。
+
+SCRIPTS = {
+    "ko": re.compile(r"[\uac00-\ud7a3]"),
+    "th": re.compile(r"[\u0e00-\u0e7f]"),
+    "ja": re.compile(r"[\u3040-\u30ff]"),
+    "fr": re.compile(r"[A-Za-z\u00c0-\u00ff\u0152\u0153]"),
+}
+HAN = re.compile(r"[\u4e00-\u9fff]")
+SEP = re.compile(r"\s*(?:\t|[:：]|\s[-—–]\s|\s{2,})\s*")
+SENTENCE_END = re.compile(r"[.!?。！？]$|다$|요$")
+READING = re.compile(r"^(.+?[\(（][\u3040-\u30ff]+[\)）])\s*(.+)$")
+
+DEFAULT_BATCH = 8
+MAX_WORD_LEN = 40
+
+
+def _is_word(text, lang):
+    if not text or len(text) > MAX_WORD_LEN or not SCRIPTS[lang].search(text):
+        return False
+    # 日语单词本身可能含汉字，其他语言的单词里出现汉字说明切分错了
+    return lang == "ja" or not HAN.search(text)
+
+
+def _is_meaning(text, lang):
+    if not text or not HAN.search(text):
+        return False
+    # 法语释义常夹带原文注释，有汉字即可；其他语言的释义里不应再出现原文
+    return lang == "fr" or not SCRIPTS[lang].search(text)
+
+
+def parse_row(line, lang):
+    """“单词 释义”式的一行，返回 (单词, 释义) 或 None。"""
+    parts = [" ".join(p.split()) for p in SEP.split(line, maxsplit=1)]
+    if len(parts) == 2 and _is_word(parts[0], lang) and _is_meaning(parts[1], lang):
+        return parts[0], parts[1]
+    line = " ".join(line.split())
+    if lang == "ja":
+        match = READING.match(line)
+        if match and _is_meaning(match.group(2), lang):
+            return match.group(1), match.group(2)
+        return None
+    # 没有分隔符时，在第一个汉字处切开
+    han = HAN.search(line)
+    if han and han.start() > 0:
+        word, meaning = line[:han.start()].strip(" \t-·•"), line[han.start():].strip()
+        if _is_word(word, lang) and _is_meaning(meaning, lang):
+            return word, meaning
+    return None
+
+
+def _is_sentence(line, lang):
+    return len(line) >= 6 and SCRIPTS[lang].search(line) and SENTENCE_END.search(line)
+
+
+def extract_rows(lines, lang):
+    rows = []
+    pending_example = None
+    for raw in lines:
+        # 保留行内的多个空格，它们常是单词与释义之间的分隔
+        line = raw.strip()
+        if not line:
+            continue
+        row = parse_row(line, lang)
+        if row is not None:
+            rows.append({"word": row[0], "meaning": row[1], "example": "", "example_cn": ""})
+            pending_example = None
+        elif rows and not rows[-1]["example"] and _is_sentence(line, lang):
+            pending_example = line = " ".join(line.split())
+            rows[-1]["example"] = line
+        elif pending_example and HAN.search(line) and not SCRIPTS[lang].search(line):
+            rows[-1]["example_cn"] = " ".join(line.split())
+            pending_example = None
+    return rows
+
+
+def page_lines(page):
+    """按版面把单词拼回视觉上的行；列之间的大间距换成制表符，方便切分单词和释义。"""
+    words = sorted(page.get_text("words"), key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+    clusters = []
+    for w in words:
+        center, height = (w[1] + w[3]) / 2, w[3] - w[1]
+        if clusters and abs(center - clusters[-1][0]) < height / 2:
+            clusters[-1][1].append(w)
+        else:
+            clusters.append([center, [w]])
+    lines = []
+    for _, cluster in clusters:
+        cluster.sort(key=lambda w: w[0])
+        parts = [cluster[0][4]]
+        for prev, w in zip(cluster, cluster[1:]):
+            gap = w[0] - prev[2]
+            parts.append(("\t" if gap > (w[3] - w[1]) else " ") + w[4])
+        lines.append("".join(parts))
+    return lines
+
+
+def extract_pages(path, lang, start, stop):
+    """进程池任务：只打开 [start, stop) 这几页，返回 (start, stop, rows, 本进程峰值内存 MB)。"""
+    import pymupdf
+    rows = []
+    with pymupdf.open(path) as doc:
+        for number in range(start, min(stop, doc.page_count)):
+            page = doc.load_page(number)
+            rows.extend(extract_rows(page_lines(page), lang))
+    return start, stop, rows, _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return 0.0
+
+
+class IngestStats:
+    def __init__(self, pages_total, start_page):
+        self.pages_total = pages_total
+        self.pages_done = start_page
+        self.rows = 0
+        self.worker_peak_rss_mb = 0.0   # 抽取在子进程里做，父进程的 RUSAGE_SELF 看不到它们
+        self.started = time.perf_counter()
+        self._resumed_from = start_page
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def pages_per_sec(self):
+        done = self.pages_done - self._resumed_from
+        return done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {"pages_done": self.pages_done, "pages_total": self.pages_total, "rows": self.rows,
+                "elapsed_s": round(self.elapsed, 2), "pages_per_sec": round(self.pages_per_sec, 2),
+                "peak_rss_mb": round(_peak_rss_mb(), 1), "worker_peak_rss_mb": round(self.worker_peak_rss_mb, 1)}
+
+
+def _finalize(part_path, out_path):
+    # 逐行把 .part 转成与现有词库一致的缩进 JSON 数组，不整体载入内存
+    with atomic_open(out_path) as out, open(part_path, "r", encoding="utf-8") as part:
+        out.write("[")
+        first = True
+        for line in part:
+            if not line.strip():
+                continue
+            body = json.dumps(json.loads(line), ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            out.write(("\n  " if first else ",\n  ") + body)
+            first = False
+        out.write("\n]" if not first else "]")
+
+
+def ingest(pdf_path, lang, out_path, workers=None, batch=DEFAULT_BATCH, on_progress=None):
+    """把 PDF 转成词库 JSON，返回 IngestStats。同一输出路径上的中断任务会自动续跑。"""
+    import pymupdf
+    if lang not in SCRIPTS:
+        raise ValueError(f"不支持的语言: {lang}")
+    with pymupdf.open(pdf_path) as doc:
+        pages_total = doc.page_count
+
+    part_path = out_path + ".part"
+    ckpt_path = out_path + ".ckpt.json"
+    digest = file_digest(pdf_path)
+    start_page = 0
+    part_bytes = 0
+    if os.path.exists(ckpt_path) and os.path.exists(part_path):
+        with open(ckpt_path, "r", encoding="utf-8") as f:
+            ckpt = json.load(f)
+        if ckpt.get("source") == digest and ckpt.get("lang") == lang:
+            start_page = ckpt["next_page"]
+            part_bytes = ckpt["part_bytes"]
+
+    stats = IngestStats(pages_total, start_page)
+    workers = workers or max(1, min(4, os.cpu_count() or 1))
+    max_inflight = workers * 2
+    batches = iter(range(start_page, pages_total, batch))
+    done = {}
+    next_page = start_page
+
+    with open(part_path, "ab") as part:
+        # 丢弃检查点之后写了一半的数据
+        part.truncate(part_bytes)
+        part.seek(part_bytes)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, max_tasks_per_child=64) as pool:
+            inflight = set()
+
+            def refill():
+                while len(inflight) < max_inflight:
+                    start = next(batches, None)
+                    if start is None:
+                        return
+                    inflight.add(pool.submit(extract_pages, pdf_path, lang, start, start + batch))
+
+            refill()
+            while inflight:
+                finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    inflight.discard(future)
+                    start, stop, rows, rss = future.result()
+                    stats.worker_peak_rss_mb = max(stats.worker_peak_rss_mb, rss)
+                    done[start] = (min(stop, pages_total), rows)
+                # 按页序落盘，乱序完成的批次先暂存（最多 max_inflight 个）
+                while next_page in done:
+                    stop, rows = done.pop(next_page)
+                    for row in rows:
+                        part.write((json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8"))
+                    part.flush()
+                    os.fsync(part.fileno())
+                    stats.rows += len(rows)
+                    stats.pages_done = next_page = stop
+                    write_json(ckpt_path, {"source": digest, "lang": lang, "next_page": next_page,
+                                            "part_bytes": part.tell()})
+                    if on_progress:
+                        on_progress(stats)
+                refill()
+
+    _finalize(part_path, out_path)
+    os.remove(part_path)
+    os.remove(ckpt_path)
+    return stats
+
+
+def output_name(pdf_path, lang, name=None):
+    stem = name or os.path.splitext(os.path.basename(pdf_path))[0]
+    return f"words_{lang}_{stem}.json"
+
+
+def available_output(out_path, pdf_path):
+    """out_path 已被占用时依次改用 <名>_2.json、<名>_3.json……
+
+    已有的词库和别的 PDF 未完成的导入都算占用；同一个 PDF 未完成的导入沿用原路径，以便续跑。
+    """
+    digest = file_digest(pdf_path)
+    stem, ext = os.path.splitext(out_path)
+    path, n = out_path, 1
+    while True:
+        try:
+            with open(path + ".ckpt.json", "r", encoding="utf-8") as f:
+                source = json.load(f).get("source")
+        except (OSError, ValueError):
+            source = None
+        if source == digest and not os.path.exists(path):
+            return path
+        if source is None and not os.path.exists(path) and not os.path.exists(path + ".part"):
+            return path
+        n += 1
+        path = f"{stem}_{n}{ext}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="从教材 PDF 抽取单词表，输出 words_<lang>_*.json")
+    parser.add_argument("pdf")
+    parser.add_argument("--lang", required=True, choices=sorted(SCRIPTS))
+    parser.add_argument("--name", help="输出文件名中的书名部分，默认取 PDF 文件名")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="每个任务处理的页数")
+    args = parser.parse_args(argv)
+
+    out_path = available_output(os.path.join(args.out_dir, output_name(args.pdf, args.lang, args.name)), args.pdf)
+
+    def report(stats):
+        s = stats.as_dict()
+        print(f"\r{s['pages_done']}/{s['pages_total']} 页  {s['rows']} 条  "
+              f"{s['pages_per_sec']} 页/秒  峰值内存 {s['peak_rss_mb']} MB（子进程 {s['worker_peak_rss_mb']} MB）", end="", file=sys.stderr)
+
+    stats = ingest(args.pdf, args.lang, out_path, workers=args.workers, batch=args.batch, on_progress=report)
+    print(file=sys.stderr)
+    print(json.dumps(dict(stats.as_dict(), output=out_path), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- 学习进度持久化 ---
+# SQLite（WAL 模式）按 (用户, 词库) 保存位置、得分、单元选择和复习状态，并记录每次作答。
+# 写入先进内存缓冲，由后台线程批量提交，点击时不会等磁盘同步；
+# 读取走内存缓存（LRU，只淘汰已落盘的记录），恢复一个会话最多一次主键查询。
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    user TEXT NOT NULL,
+    book TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    score INTEGER NOT NULL DEFAULT 0,
+    units TEXT,
+    srs BLOB,
+    updated REAL NOT NULL,
+    PRIMARY KEY (user, book)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    book TEXT NOT NULL,
+    entry INTEGER NOT NULL,
+    grade INTEGER NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reviews_user_book ON reviews (user, book, ts);
+"""
+
+COLUMNS = ("position", "score", "units", "srs")
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ProgressStore:
+    def __init__(self, path, flush_interval=2.0, max_pending=512, max_cached=256):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_cached = max_cached
+        self.flushes = 0
+        self._conn = _connect(path)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # 后台线程、history() 和 close() 都会 flush，同一时间只提交一批
+        self._flush_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._dirty = {}
+        self._flushing = {}     # 已取出、正在提交的记录，提交完成前不能淘汰
+        self._reviews = []
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def load(self, user, book):
+        """返回 {'position', 'score', 'units', 'srs'}，没有记录时返回 None。"""
+        key = (user, book)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT position, score, units, srs FROM progress WHERE user = ? AND book = ?", key).fetchone()
+        record = None
+        if row is not None:
+            record = dict(zip(COLUMNS, row))
+            record["units"] = json.loads(record["units"]) if record["units"] else []
+        with self._lock:
+            if key in self._cache:
+                # 并发加载时以先到的（或期间保存过的）为准
+                return self._cache[key]
+            self._remember(key, record)
+            return record
+
+    def save(self, user, book, **fields):
+        """只更新内存并标记待写入；与缓存相同的字段不会触发写入。"""
+        key = (user, book)
+        record = self.load(user, book) or {"position": 0, "score": 0, "units": [], "srs": None}
+        changed = {k: v for k, v in fields.items() if record.get(k) != v}
+        if not changed:
+            return False
+        with self._lock:
+            record = dict(record, **changed)
+            self._dirty[key] = record
+            self._remember(key, record)
+            pending = len(self._dirty) + len(self._reviews)
+        if pending >= self.max_pending:
+            self._wake.set()
+        return True
+
+    def _remember(self, key, record):
+        # 调用方持有 self._lock
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        self._trim()
+
+    def _trim(self):
+        excess = len(self._cache) - self.max_cached
+        if excess <= 0:
+            return
+        for key in list(self._cache):
+            if excess <= 0:
+                break
+            # 还没写进数据库的记录留在内存里，否则下次 load 会读到旧值
+            if key not in self._dirty and key not in self._flushing:
+                del self._cache[key]
+                excess -= 1
+
+    def log_review(self, user, book, entry, grade, ts=None):
+        with self._lock:
+            self._reviews.append((user, book, entry, grade, ts or time.time()))
+            pending = len(self._dirty) + len(self._reviews)
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def history(self, user, book, limit=100):
+        self.flush()
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT entry, grade, ts FROM reviews WHERE user = ? AND book = ? ORDER BY ts DESC LIMIT ?",
+                (user, book, limit)).fetchall()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                reviews, self._reviews = self._reviews, []
+                self._flushing = dirty
+            if not dirty and not reviews:
+                return
+            try:
+                self._commit(dirty, reviews)
+            except sqlite3.Error:
+                # 提交失败（如 database is locked）时把这一批放回去等下次重试；
+                # 期间又保存过的记录以新值为准，作答记录保持原来的顺序
+                with self._lock:
+                    for key, record in dirty.items():
+                        self._dirty.setdefault(key, record)
+                    self._reviews[:0] = reviews
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+                    self._trim()
+
+    def _commit(self, dirty, reviews):
+        now = time.time()
+        rows = [(user, book, r["position"], r["score"], json.dumps(r["units"], ensure_ascii=False), r["srs"], now)
+                for (user, book), r in dirty.items()]
+        with self._db_lock:
+            # 一个事务提交整批，WAL 下只有一次 fsync
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO progress (user, book, position, score, units, srs, updated) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (user, book) DO UPDATE SET position = excluded.position, score = excluded.score, "
+                    "units = excluded.units, srs = excluded.srs, updated = excluded.updated", rows)
+                self._conn.executemany(
+                    "INSERT INTO reviews (user, book, entry, grade, ts) VALUES (?, ?, ?, ?, ?)", reviews)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.flushes += 1
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # 这一批已放回队列，下一轮再试，不拖垮后台线程
+                pass
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
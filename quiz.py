@@ -0,0 +1,163 @@
+import heapq
+import random
+import re
+import threading
+import weakref
+from array import array
+
+# --- 练习模式干扰项索引 ---
+# 每本词库只建一次：释义的字/双字 n-gram 倒排表 + 按释义长度分桶。
+# 出题时只看当前词的几个 n-gram 和同单元的词，挑出“长得像但意思不同”的干扰项，
+# 每题的开销与词库大小无关。
+
+TOP_K = 8
+MAX_DF = 64
+
+_PAREN = re.compile(r"[\(（][^\)）]*[\)）]")
+_PART_SEP = re.compile(r"[；;，,、/]")
+
+
+def split_meaning(meaning):
+    """释义拆成 [(规范化的义项, 原文义项), ...]，规范化时去掉括注和空白；空义项跳过。"""
+    if not isinstance(meaning, str):
+        return []
+    parts = []
+    for part in _PART_SEP.split(meaning):
+        key = "".join(_PAREN.sub("", part).split()).casefold()
+        if key:
+            parts.append((key, part.strip()))
+    return parts
+
+
+def meaning_parts(meaning):
+    """释义拆成若干义项并规范化，用来判断两个选项是否“意思相同”。"""
+    return frozenset(key for key, _ in split_meaning(meaning))
+
+
+def parts_overlap(a, b):
+    """两组义项有相同或互相包含（至少两个字）的义项即视为同义。"""
+    if not a.isdisjoint(b):
+        return True
+    for p in a:
+        if len(p) < 2:
+            continue
+        for q in b:
+            if len(q) >= 2 and (p in q or q in p):
+                return True
+    return False
+
+
+def meaning_grams(meaning):
+    if not isinstance(meaning, str):
+        return set()
+    chars = [c for c in _PAREN.sub("", meaning) if c.isalnum()]
+    grams = set(chars)
+    grams.update(a + b for a, b in zip(chars, chars[1:]))
+    return grams
+
+
+class DistractorIndex:
+    def __init__(self, deck, top_k=TOP_K):
+        self.deck = deck
+        self.top_k = top_k
+        self._grams = []
+        postings = {}
+        by_length = {}
+        for pos, meaning in enumerate(deck.meanings):
+            grams = meaning_grams(meaning)
+            self._grams.append(grams)
+            for g in grams:
+                postings.setdefault(g, array("I")).append(pos)
+            by_length.setdefault(len(meaning or ""), array("I")).append(pos)
+        # 出现太频繁的字（如“的”）区分度低，不参与相似度，同时保证每题扫描量有上界
+        self._postings = {g: p for g, p in postings.items() if len(p) <= MAX_DF}
+        self._by_length = by_length
+        self._parts = {}
+        self._neighbors = {}
+        self._lock = threading.Lock()
+
+    def _meaning_parts(self, pos):
+        parts = self._parts.get(pos)
+        if parts is None:
+            parts = self._parts[pos] = meaning_parts(self.deck.meanings[pos])
+        return parts
+
+    def _distinct(self, pos, answer, taken_parts):
+        if pos == answer or self.deck.words[pos] == self.deck.words[answer]:
+            return False
+        parts = self._meaning_parts(pos)
+        return bool(parts) and not parts_overlap(parts, taken_parts)
+
+    def neighbors(self, answer, unit=None):
+        """按相似度排序的候选干扰项（已排除同义项），结果按 (词, 单元) 记忆。"""
+        cache_key = (answer, unit)
+        cached = self._neighbors.get(cache_key)
+        if cached is not None:
+            return cached
+        deck = self.deck
+        scores = {}
+        for g in self._grams[answer]:
+            for pos in self._postings.get(g, ()):
+                scores[pos] = scores.get(pos, 0) + (2 if len(g) > 1 else 1)
+        if unit is not None:
+            for pos in deck.unit_entries(unit):
+                scores[pos] = scores.get(pos, 0) + 1.5
+        length = len(deck.meanings[answer] or "")
+        ranked = heapq.nlargest(
+            self.top_k * 8, scores,
+            key=lambda pos: scores[pos] - 0.3 * abs(len(deck.meanings[pos] or "") - length))
+        answer_parts = self._meaning_parts(answer)
+        result = []
+        for pos in ranked:
+            if self._distinct(pos, answer, answer_parts):
+                result.append(pos)
+                if len(result) == self.top_k * 2:
+                    break
+        with self._lock:
+            self._neighbors[cache_key] = result
+        return result
+
+    def _random_fallback(self, answer, taken_parts, exclude, rng, tries=64):
+        # 先在释义长度相近的桶里找，再退到整本书随机抽
+        length = len(self.deck.meanings[answer] or "")
+        pools = [self._by_length.get(n) for n in (length, length - 1, length + 1)]
+        pools = [p for p in pools if p] + [None]
+        for pool in pools:
+            for _ in range(tries):
+                pos = rng.choice(pool) if pool is not None else rng.randrange(len(self.deck))
+                if pos not in exclude and self._distinct(pos, answer, taken_parts):
+                    return pos
+        return None
+
+    def pick(self, answer, unit=None, k=3, rng=random):
+        """为词条 answer 挑 k 个互不同义的干扰项，返回词条下标列表（可能不足 k 个）。"""
+        taken_parts = set(self._meaning_parts(answer))
+        chosen = []
+        candidates = self.neighbors(answer, unit)
+        pool = candidates[:self.top_k]
+        for pos in rng.sample(pool, len(pool)) + candidates[self.top_k:]:
+            if len(chosen) == k:
+                break
+            if self._distinct(pos, answer, taken_parts):
+                chosen.append(pos)
+                taken_parts |= self._meaning_parts(pos)
+        while len(chosen) < k:
+            pos = self._random_fallback(answer, taken_parts, chosen, rng)
+            if pos is None:
+                break
+            chosen.append(pos)
+            taken_parts |= self._meaning_parts(pos)
+        return chosen
+
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def distractor_index(deck):
+    """每个 Deck 对应一个索引，Deck 被缓存淘汰后索引随之释放。"""
+    with _indexes_lock:
+        index = _indexes.get(deck)
+        if index is None:
+            index = _indexes[deck] = DistractorIndex(deck)
+        return index
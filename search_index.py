@@ -0,0 +1,250 @@
+import heapq
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from itertools import compress, islice, repeat
+from operator import add, contains, truediv
+
+from deck_cache import book_key, load_book
+
+# --- 跨词库搜索 ---
+# 对单词/释义/例句建字符 n-gram（单字 + 词内双字）倒排表，韩文、泰文、日文假名汉字、
+# 法文和中文释义都不需要分词。每本书一个子索引，文件变化时只重建那一本。
+# 一两个字的查询本身就是一个 n-gram，命中集合和排序在建索引时就算好（常见 n-gram），
+# 查询时只做各书之间的归并；更长的查询求倒排表交集后校验，校验数有上限，
+# 最近的结果按书留着，翻页和页面重跑时同样只做归并。
+# 子索引不持有 Deck，词库的内存仍由 DeckCache 的上限管理；显示命中时再经缓存取词条。
+
+FIELD_WEIGHTS = (("word", 3.0), ("meaning", 2.0), ("example", 1.0))
+# 这些字段可能是“义项；义项”，命中完整义项也算精确；例句里的逗号只是标点
+PART_FIELDS = ("word", "meaning")
+# 在任一字段出现超过这么多次的 n-gram 预先排好序；更少的查询时现算
+RANK_MIN = 16
+# 长查询每本书每个字段最多校验的候选数，超出时总数是下限
+MAX_VERIFY = 2000
+# 每本书留下最近这么多个长查询的结果：翻页和页面重跑都是同一个查询
+RECENT_QUERIES = 32
+
+
+def normalize(text):
+    if not isinstance(text, str):
+        return ""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def _bigrams(tokens):
+    return {t[i:i + 2] for t in tokens for i in range(len(t) - 1)}
+
+
+def grams_of(text):
+    """单字和词内双字；双字不跨空白，一两个字的查询命中 n-gram 就等于文本里含有它。"""
+    tokens = normalize(text).split()
+    grams = {c for t in tokens for c in t}
+    grams.update(_bigrams(tokens))
+    return grams
+
+
+def query_grams(query):
+    """查询用的 n-gram：每个词取双字（更有区分度），单字的词取单字。"""
+    tokens = normalize(query).split()
+    grams = _bigrams(tokens)
+    grams.update(t for t in tokens if len(t) == 1)
+    return list(grams)
+
+
+class BookIndex:
+    def __init__(self, path, key, deck):
+        self.path = path
+        self.key = key
+        self.fields = {}
+        # 预先规范化的文本，查询校验时直接比较；驻留后与原文相同的字符串不额外占内存
+        self.columns = {}
+        for field, column in (("word", deck.words), ("meaning", deck.meanings), ("example", deck.examples)):
+            postings = {}
+            normalized = []
+            for pos, text in enumerate(column):
+                normalized.append(sys.intern(normalize(text)))
+                for g in grams_of(text):
+                    postings.setdefault(g, array("I")).append(pos)
+            self.fields[field] = postings
+            self.columns[field] = normalized
+        # 每个词条第一次出现的单元和在该单元中的位置，跳转时用
+        self.unit_names = list(deck.unit_names)
+        self.entry_unit = array("I", [0]) * len(deck)
+        self.entry_offset = array("I", [0]) * len(deck)
+        seen = set()
+        for k, unit in enumerate(deck.unit_names):
+            for offset, pos in enumerate(deck.unit_entries(unit)):
+                if pos not in seen:
+                    seen.add(pos)
+                    self.entry_unit[pos] = k
+                    self.entry_offset[pos] = offset
+        # gram -> (按分数从高到低的词条下标, 对应分数)
+        self.ranked = {}
+        counts = {}
+        for postings in self.fields.values():
+            for g, p in postings.items():
+                counts[g] = counts.get(g, 0) + len(p)
+        for g, n in counts.items():
+            if n > RANK_MIN:
+                self.ranked[g] = self.rank(g)
+        self.recent = {}
+        self._recent_lock = threading.Lock()
+
+    def rank(self, gram):
+        """查询正好是 gram 时的全部命中，格式同 match；常见的 gram 在建索引时已经算好。"""
+        ranked = self.ranked.get(gram)
+        if ranked is None:
+            ranked = self.match(gram, [gram])[:2]
+        return ranked
+
+    def match(self, q, grams, limit=None):
+        """含有 q 的词条，返回 (按分数从高到低的下标, 对应分数, 是否截断)。
+
+        候选是各 n-gram 倒排表的交集；每个字段最多校验 limit 个候选，超出时截断。
+        """
+        scores = {}
+        truncated = False
+        for field, weight in FIELD_WEIGHTS:
+            found = self.candidates(field, grams)
+            if limit is not None and len(found) > limit:
+                truncated = True
+                found = sorted(found)[:limit]
+            found = field_scores(q, self.columns[field], found, weight, field in PART_FIELDS)
+            if not scores:
+                scores = found
+                continue
+            both = scores.keys() & found.keys()
+            merged = {**scores, **found}
+            for pos in both:
+                merged[pos] = scores[pos] + found[pos]
+            scores = merged
+        # 先按下标排，再按分数稳定地倒排：同分的词条保持下标顺序
+        order = sorted(sorted(scores), key=scores.__getitem__, reverse=True)
+        return array("I", order), array("d", map(scores.__getitem__, order)), truncated
+
+    def lookup(self, q, grams):
+        """长查询的命中，格式同 match；最近的查询直接取上次的结果。"""
+        with self._recent_lock:
+            found = self.recent.pop(q, None)
+        if found is None:
+            found = self.match(q, grams, MAX_VERIFY)
+        with self._recent_lock:
+            self.recent[q] = found
+            while len(self.recent) > RECENT_QUERIES:
+                del self.recent[next(iter(self.recent))]
+        return found
+
+    def candidates(self, field, grams):
+        """各 n-gram 倒排表的交集（下标的集合或数组，不保证有序）。"""
+        postings = self.fields[field]
+        lists = []
+        for g in grams:
+            p = postings.get(g)
+            if not p:
+                return []
+            lists.append(p)
+        if len(lists) == 1:
+            return lists[0]
+        lists.sort(key=len)
+        return set(lists[0]).intersection(*lists[1:])
+
+    def text(self, field, pos):
+        return self.columns[field][pos]
+
+
+_has_sep = re.compile("[,;，；]").search
+
+
+def _is_part(q, text):
+    return q in map(str.strip, text.replace("；", ";").replace("，", ",").replace(",", ";").split(";"))
+
+
+def field_scores(q, column, positions, weight, parts=True):
+    """positions 中文本含有 q 的词条及其分数 {下标: 分数}。
+
+    先给所有命中按长度算基础分，再覆盖少数完整义项、前缀和完全相同的命中；
+    筛选和基础分都是 map/compress，在 C 里逐条完成，不做逐条的 Python 判断。
+    parts 为真时，含分隔符的文本还要检查是否命中完整义项。
+    """
+    texts = list(map(column.__getitem__, positions))
+    keep = list(map(contains, texts, repeat(q)))
+    positions = list(compress(positions, keep))
+    texts = list(compress(texts, keep))
+    n = len(q)
+    scores = dict(zip(positions, map(add, repeat(weight * 2),
+                                     map(truediv, repeat(weight * n), map(len, texts)))))
+    if parts and n > 1:
+        for pos, text in compress(zip(positions, texts), map(_has_sep, texts)):
+            if _is_part(q, text):
+                scores[pos] = weight * 8
+    for pos, text in compress(zip(positions, texts), map(str.startswith, texts, repeat(q))):
+        scores[pos] = weight * 10 if text == q else weight * 5
+    return scores
+
+
+class SearchIndex:
+    def __init__(self, deck_cache):
+        self.deck_cache = deck_cache
+        self.books = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, paths):
+        """按 stat 检查各词库，只重建新增或改动过的书；返回重建的书。"""
+        rebuilt = []
+        with self._lock:
+            wanted = set(paths)
+            for path in list(self.books):
+                if path not in wanted:
+                    del self.books[path]
+            for path in paths:
+                try:
+                    key, _ = book_key(path)
+                except OSError:
+                    self.books.pop(path, None)
+                    continue
+                current = self.books.get(path)
+                if current is not None and current.key == key:
+                    continue
+                self.books[path] = BookIndex(path, key, load_book(self.deck_cache, path))
+                rebuilt.append(path)
+        return rebuilt
+
+    def search(self, query, page=0, per_page=10, books=None):
+        """返回 (命中总数, [(分数, 书, 词条下标), ...] 中的一页, 是否截断)。
+
+        截断只发生在长查询某个字段的候选超过 MAX_VERIFY 时，此时总数是下限。
+        """
+        q = " ".join(normalize(query).split())
+        grams = query_grams(q)
+        if not grams:
+            return 0, [], False
+        indexes = [(path, index) for path, index in list(self.books.items())
+                   if books is None or path in books]
+        total = 0
+        truncated = False
+        runs = []
+        for path, index in indexes:
+            if grams == [q]:
+                # 查询本身就是一个 n-gram：命中和排序大多已经算好
+                positions, scores = index.rank(q)
+            else:
+                positions, scores, cut = index.lookup(q, grams)
+                truncated = truncated or cut
+            total += len(positions)
+            runs.append(zip(map(float.__neg__, scores), repeat(path), positions))
+        # 各书的命中已按分数排好，只归并出需要的前几名
+        start = page * per_page
+        top = islice(heapq.merge(*runs), start + per_page)
+        return total, [(-s, path, pos) for s, path, pos in top][start:], truncated
+
+    def locate(self, path, pos):
+        """命中词条 -> (单元名, 单元内位置)。"""
+        index = self.books[path]
+        return index.unit_names[index.entry_unit[pos]], index.entry_offset[pos]
+
+    def card(self, path, pos):
+        # 经 DeckCache 取词条：书被淘汰时重新加载，索引本身不让它常驻内存
+        return load_book(self.deck_cache, path).card(pos)
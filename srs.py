@@ -0,0 +1,154 @@
+import heapq
+import time
+from array import array
+
+# --- 间隔重复调度 ---
+# SM-2 的简化实现。每张卡的状态放在定长数组里（每张约 14 字节），
+# 到期的卡放在小顶堆中，“下一张该复习的卡”是 O(log n)。
+
+GRADE_AGAIN = 1
+GRADE_HARD = 3
+GRADE_GOOD = 4
+GRADE_EASY = 5
+
+DEFAULT_EASE = 2500       # 难度系数 ×1000
+MIN_EASE = 1300
+RELEARN_MINUTES = 10
+DAY_MINUTES = 24 * 60
+CARD_BYTES = sum(array(code).itemsize for code in "HIHHI")
+
+
+class Scheduler:
+    """一本词库的复习状态，按词条下标索引。due == 0 表示从未复习过的新卡。"""
+
+    def __init__(self, size):
+        self.ease = array("H", [DEFAULT_EASE]) * size
+        self.interval = array("I", [0]) * size    # 分钟
+        self.reps = array("H", [0]) * size
+        self.lapses = array("H", [0]) * size
+        self.due = array("I", [0]) * size         # Unix 秒
+        self.reviewed = 0
+
+    def __len__(self):
+        return len(self.due)
+
+    def is_new(self, pos):
+        return self.due[pos] == 0
+
+    def review(self, pos, grade, now=None):
+        """记录一次作答（grade 取 0-5），返回下次到期时间。"""
+        now = int(now or time.time())
+        if self.due[pos] == 0:
+            self.reviewed += 1
+        ease = self.ease[pos]
+        if grade < 3:
+            self.reps[pos] = 0
+            self.lapses[pos] = min(self.lapses[pos] + 1, 0xFFFF)
+            interval = RELEARN_MINUTES
+        else:
+            reps = self.reps[pos]
+            if reps == 0:
+                interval = DAY_MINUTES
+            elif reps == 1:
+                interval = 6 * DAY_MINUTES
+            else:
+                interval = self.interval[pos] * ease // 1000
+            self.reps[pos] = min(reps + 1, 0xFFFF)
+        q = 5 - grade
+        ease += 100 - q * (80 + q * 20)
+        self.ease[pos] = max(MIN_EASE, min(ease, 0xFFFF))
+        self.interval[pos] = min(interval, 0xFFFFFFFF)
+        self.due[pos] = now + interval * 60
+        return self.due[pos]
+
+    def to_bytes(self):
+        return b"".join(a.tobytes() for a in (self.ease, self.interval, self.reps, self.lapses, self.due))
+
+    @classmethod
+    def from_bytes(cls, data, size):
+        if len(data) != CARD_BYTES * size:
+            raise ValueError("复习状态与词库大小不一致")
+        sched = cls(0)
+        offset = 0
+        for name in ("ease", "interval", "reps", "lapses", "due"):
+            column = getattr(sched, name)
+            length = column.itemsize * size
+            column.frombytes(data[offset:offset + length])
+            offset += length
+        sched.reviewed = sum(1 for d in sched.due if d)
+        return sched
+
+    def stats(self, now=None):
+        now = int(now or time.time())
+        due_now = sum(1 for d in self.due if d and d <= now)
+        return {"cards": len(self), "reviewed": self.reviewed, "due": due_now,
+                "lapses": sum(self.lapses)}
+
+
+class ReviewQueue:
+    """针对当前所选单元的复习队列：到期卡（堆）> 新卡（按顺序）> 提前复习。"""
+
+    def __init__(self, scheduler, view):
+        self.scheduler = scheduler
+        self.view = view
+        self._heap = []
+        self._new_cursor = 0
+        if scheduler.reviewed:
+            due = scheduler.due
+            self._heap = [(due[pos], i, pos) for i, pos in enumerate(view.positions()) if due[pos]]
+            heapq.heapify(self._heap)
+
+    def _valid(self, entry):
+        due, _, pos = entry
+        return self.scheduler.due[pos] == due
+
+    def _compact(self):
+        if len(self._heap) > 64 and len(self._heap) > 2 * self.scheduler.reviewed:
+            self._heap = [e for e in self._heap if self._valid(e)]
+            heapq.heapify(self._heap)
+
+    def record(self, index, grade, now=None):
+        pos = self.view.locate(index)[0]
+        due = self.scheduler.review(pos, grade, now)
+        # 旧的堆项不删除，出堆时按 due 是否一致判断是否过期
+        heapq.heappush(self._heap, (due, index, pos))
+        self._compact()
+        return due
+
+    def _peek_due(self, exclude, now=None):
+        """返回堆中最早到期、且不是 exclude 的卡；now 为 None 时不看是否已到期。"""
+        popped = []
+        found = None
+        while self._heap:
+            entry = self._heap[0]
+            if not self._valid(entry):
+                heapq.heappop(self._heap)
+                continue
+            if entry[1] == exclude:
+                popped.append(heapq.heappop(self._heap))
+                continue
+            if now is None or entry[0] <= now:
+                found = entry[1]
+            break
+        for entry in popped:
+            heapq.heappush(self._heap, entry)
+        return found
+
+    def next_index(self, exclude=None, now=None):
+        now = int(now or time.time())
+        index = self._peek_due(exclude, now)
+        if index is not None:
+            return index
+        while self._new_cursor < len(self.view):
+            i = self._new_cursor
+            self._new_cursor += 1
+            if i != exclude and self.scheduler.is_new(self.view.locate(i)[0]):
+                return i
+        index = self._peek_due(exclude)
+        if index is not None:
+            return index
+        return ((exclude or 0) + 1) % len(self.view)
+
+    def due_count(self, now=None):
+        now = int(now or time.time())
+        return sum(1 for e in self._heap if e[0] <= now and self._valid(e))
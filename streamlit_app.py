@@ -1,22 +1,40 @@
 import streamlit as st
-import google.generativeai as genai
-import json
+import hashlib
 import os
-import re
 import random
 import time
-from gtts import gTTS
-from io import BytesIO
+import uuid
+from ai_helper import FIELDS as AI_FIELDS, AnalysisCache, GeminiBackend
+from book_catalog import Catalog
+from card_nav import card_nav, build_payload, new_batch
+from deck import Deck
+from deck_cache import DeckCache, load_book, load_upload
+from metrics import Registry, Timed
+from pdf_ingest import available_output, ingest, output_name
+from progress_store import ProgressStore
+from quiz import distractor_index
+from search_index import SearchIndex
+from srs import GRADE_AGAIN, GRADE_GOOD, ReviewQueue, Scheduler
+from tts_cache import AudioCache, AudioPrefetcher, GTTSBackend
+from upload_loader import UploadError
 
 # --- 页面配置 ---
 st.set_page_config(page_title="语言 Master", page_icon="🦉", layout="centered", initial_sidebar_state="collapsed")
 
-# --- 兼容性处理 ---
-def rerun():
-    if hasattr(st, "rerun"):
-        st.rerun()
-    else:
-        st.experimental_rerun()
+# --- 运行指标 ---
+@st.cache_resource
+def get_metrics():
+    # METRICS_FILE 定期写 Prometheus 文本文件，METRICS_PORT 在本机端口上提供 /metrics
+    registry = Registry()
+    if os.environ.get("METRICS_FILE"):
+        registry.start_file_exporter(os.environ["METRICS_FILE"])
+    if os.environ.get("METRICS_PORT"):
+        registry.start_http_server(int(os.environ["METRICS_PORT"]))
+    return registry
+
+metrics = get_metrics()
+# 用 st.stop()/st.rerun() 提前结束的重跑不计入总耗时
+rerun_timer = metrics.timer("rerun_seconds", "一次脚本重跑的总耗时")
 
 # --- 核心样式美化 ---
 st.markdown("""
@@ -223,8 +241,100 @@ if 'quiz_answered' not in st.session_state: st.session_state.quiz_answered = Fal
 if 'quiz_correct' not in st.session_state: st.session_state.quiz_correct = False
 if 'quiz_options' not in st.session_state: st.session_state.quiz_options = []
 if 'current_book' not in st.session_state: st.session_state.current_book = None
+if 'session_uid' not in st.session_state: st.session_state.session_uid = uuid.uuid4().hex
+if 'srs' not in st.session_state: st.session_state.srs = {}
+
+# --- 学习进度 ---
+@st.cache_resource
+def get_progress_store():
+    # 所有会话共用一个 SQLite 文件，后台线程批量写入
+    return ProgressStore(os.environ.get("PROGRESS_DB", ".progress.sqlite3"))
+
+# 用户标识放在 URL 里，刷新页面或服务重启后仍能找回进度
+if "uid" not in st.query_params: st.query_params["uid"] = uuid.uuid4().hex
+user_id = st.query_params["uid"]
+
+@st.cache_resource
+def get_deck_cache():
+    # 进程级单例，所有会话共享已解析的词库；上限按解析后的内存占用计算
+    cache = DeckCache(max_bytes=64 * 1024 * 1024)
+    get_metrics().add_collector("deck_cache", cache.stats)
+    return cache
+
+@st.cache_resource
+def get_catalog():
+    # 书目清单：词条数、单元数等元数据落盘，重启后不必重新解析每本书
+    prefixes = tuple(cfg["file_prefix"] for cfg in LANG_CONFIG.values())
+    return Catalog(get_deck_cache(), ".", prefixes, os.environ.get("CATALOG_PATH", ".catalog.json"), compile_decks=True)
+
+# --- 跨词库搜索 ---
+@st.cache_resource
+def get_search_index():
+    return SearchIndex(get_deck_cache())
+
+SEARCH_PAGE_SIZE = 8
+
+def jump_to_hit(path, pos):
+    # 切换到命中词所在的语言、书和单元，并定位到该词
+    unit, offset = get_search_index().locate(path, pos)
+    st.session_state.lang_select = next(name for name, cfg in LANG_CONFIG.items() if path.startswith(cfg["file_prefix"]))
+    st.session_state.book_select = path
+    st.session_state.pending_jump = (path, unit, offset)
+
+def render_search(query):
+    all_books = [info.path for info in get_catalog().books() if not info.error]
+    index = get_search_index()
+    with st.spinner("建立索引..."):
+        index.refresh(all_books)
+    if st.session_state.get('search_last') != query:
+        st.session_state.search_last = query
+        st.session_state.search_page = 0
+    page = st.session_state.search_page
+    total, hits, truncated = index.search(query, page=page, per_page=SEARCH_PAGE_SIZE)
+    if not total:
+        st.caption("没有找到")
+        return
+    for i, (_, path, pos) in enumerate(hits):
+        card = index.card(path, pos)
+        st.button(f"{card['word']} · {card['meaning']}", key=f"hit_{i}", help=path, use_container_width=True,
+                  on_click=jump_to_hit, args=(path, pos))
+    pages = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    p_prev, p_info, p_next = st.columns([1, 2, 1])
+    if p_prev.button("‹", key="search_prev", disabled=page == 0):
+        st.session_state.search_page = page - 1
+        st.rerun()
+    p_info.caption(f"{page + 1}/{pages} 页 · {total}{'+' if truncated else ''} 条")
+    if p_next.button("›", key="search_next", disabled=page + 1 >= pages):
+        st.session_state.search_page = page + 1
+        st.rerun()
+
+# --- PDF 教材导入 ---
+def import_pdf(pdf_file, lang_code):
+    # 上传内容按哈希落盘，同一个 PDF 中断后再次导入会从检查点继续
+    data = pdf_file.getvalue()
+    upload_dir = os.environ.get("PDF_UPLOAD_DIR", ".pdf_uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    pdf_path = os.path.join(upload_dir, hashlib.sha1(data).hexdigest() + ".pdf")
+    if not os.path.exists(pdf_path):
+        with open(pdf_path, "wb") as f: f.write(data)
+    # 不覆盖已有的词库（包括仓库自带的和别人导入的）
+    out_path = available_output(output_name(pdf_file.name, lang_code), pdf_path)
+    bar = st.progress(0.0, text="准备中...")
+    def on_progress(stats):
+        s = stats.as_dict()
+        bar.progress(s["pages_done"] / max(s["pages_total"], 1),
+                     text=f"{s['pages_done']}/{s['pages_total']} 页 · {s['rows']} 条 · {s['pages_per_sec']} 页/秒")
+    try:
+        stats = ingest(pdf_path, lang_code, out_path, on_progress=on_progress)
+    except Exception as e:
+        st.error(f"PDF 导入失败: {e}")
+        return
+    os.remove(pdf_path)
+    get_catalog().refresh(force=True)
+    st.success(f"已生成 {out_path}（{stats.rows} 条，{stats.pages_per_sec:.1f} 页/秒）")
 
 # --- 侧边栏 ---
+stage_timer = metrics.timer("stage_seconds", "重跑中各阶段的耗时", stage="sidebar")
 with st.sidebar:
     st.title("⚙️ 设置")
     
@@ -247,88 +357,128 @@ with st.sidebar:
         st.info("💡 提示：配置 Secrets 可免重复输入")
         api_key = st.text_input("Gemini API Key", value="", type="password", help="在此输入 Key")
 
+    # 节流轮询：多数重跑直接返回，到期时也只 stat 目录和已知的书
+    with st.spinner("整理书目..."):
+        get_catalog().refresh()
+
+    with st.expander("🔍 搜索全部词库"):
+        search_query = st.text_input("关键词", key="search_query", placeholder="单词 / 中文释义 / 例句")
+        if search_query.strip(): render_search(search_query.strip())
+
     st.divider()
-    selected_lang = st.selectbox("当前语言", options=list(LANG_CONFIG.keys()))
+    selected_lang = st.selectbox("当前语言", options=list(LANG_CONFIG.keys()), key="lang_select")
     
     prefix = LANG_CONFIG[selected_lang]["file_prefix"]
-    try:
-        all_files = os.listdir('.')
-        available_books = [f for f in all_files if f.startswith(prefix) and f.endswith('.json')]
-    except:
-        available_books = []
+    available_books = {info.path: info for info in get_catalog().books(prefix)}
     
     book_options = ["默认演示词库"]
     if available_books:
-        book_options = sorted(available_books)
+        book_options = list(available_books)
         
-    selected_book = st.selectbox("📚 选择教材/书籍", options=book_options)
+    selected_book = st.selectbox("📚 选择教材/书籍", options=book_options, key="book_select",
+                                 format_func=lambda p: available_books[p].label() if p in available_books else p)
+    book_info = available_books.get(selected_book)
+    if book_info and not book_info.error:
+        st.caption(f"{book_info.entries} 条 · {book_info.distinct} 个不同的词 · {book_info.units} 单元 · #{book_info.sha1[:8]}")
     
     if ('prev_lang' not in st.session_state or st.session_state.prev_lang != selected_lang or 
         st.session_state.current_book != selected_book):
-        st.session_state.current_index = 0
+        saved = get_progress_store().load(user_id, selected_book) or {}
+        st.session_state.restored_units = saved.get("units", [])
+        st.session_state.current_index = saved.get("position", 0)
         st.session_state.flipped = False
         st.session_state.ai_analysis = None
         st.session_state.audio_bytes = None
         st.session_state.ai_audio_bytes = None
-        st.session_state.quiz_score = 0
+        st.session_state.quiz_score = saved.get("score", 0)
         st.session_state.quiz_answered = False
         st.session_state.quiz_options = []
         st.session_state.prev_lang = selected_lang
         st.session_state.current_book = selected_book
 
+    jump = st.session_state.pop('pending_jump', None)
+    if jump and jump[0] == selected_book:
+        st.session_state.restored_units = [jump[1]]
+        st.session_state.current_index = jump[2]
+        st.session_state.jump_seq = st.session_state.get('jump_seq', 0) + 1
+        st.session_state.flipped = False
+        st.session_state.ai_analysis = None
+        st.session_state.audio_bytes = None
+        st.session_state.ai_audio_bytes = None
+        st.session_state.quiz_answered = False
+        st.session_state.quiz_options = []
+
     st.divider()
     mode = st.radio("选择模式", ["📖 卡片学习", "⚔️ 强化练习"])
+    srs_enabled = st.toggle("🧠 按记忆曲线复习", help="优先出到期的卡，其次是没学过的新卡")
+    shuffle_enabled = st.toggle("🔀 随机顺序", help="在所选单元里随机出卡（开启记忆曲线复习时不生效）")
+    client_nav = st.toggle("⚡ 本地翻卡（省流量）", key="client_nav",
+                           help="整个单元一次发到浏览器，翻卡和作答在本地完成，结果成批回传；单元内按顺序出卡")
     st.divider()
     uploaded_file = st.file_uploader("手动上传单词库 (JSON)", type="json")
+    book_id = f"upload:{uploaded_file.name}" if uploaded_file else selected_book
+    with st.expander("📄 从 PDF 教材导入"):
+        pdf_file = st.file_uploader("上传教材 PDF", type="pdf", key="pdf_upload")
+        if pdf_file and st.button("开始导入", use_container_width=True):
+            import_pdf(pdf_file, LANG_CONFIG[selected_lang]["code"])
+
+stage_timer.stop()
 
 # --- 数据加载逻辑 ---
+def show_load_report(report):
+    if not report or not report.error_count: return
+    st.sidebar.warning(f"已跳过 {report.error_count} 条有问题的词条，载入 {report.entries_ok} 条")
+    with st.sidebar.expander("查看问题词条"):
+        for error in report.errors:
+            st.caption(str(error))
+        if report.error_count > len(report.errors):
+            st.caption(f"……另有 {report.error_count - len(report.errors)} 条未列出")
+
 def load_raw_data():
+    deck_cache = get_deck_cache()
     if uploaded_file:
-        try: return json.load(uploaded_file)
-        except: st.error("JSON 格式错误")
+        try:
+            deck = load_upload(deck_cache, uploaded_file)
+        except UploadError as e:
+            st.error(f"上传的词库无法加载: {e}")
+        else:
+            show_load_report(deck.load_report)
+            return deck
     
     if selected_book and selected_book != "默认演示词库":
         if os.path.exists(selected_book):
-            with open(selected_book, "r", encoding="utf-8") as f:
-                return json.load(f)
+            try: return load_book(deck_cache, selected_book)
+            except ValueError as e:
+                st.error(f"词库加载失败: {e}")
+                st.stop()
     
-    return [{"word": f"Demo {i}", "meaning": f"示例 {i}", "example": "Test", "example_cn": "测试"} for i in range(1, 45)]
-
-def process_data_selection(raw_data):
-    final_list = []
-    processed_data = {}
-
-    if isinstance(raw_data, list):
-        chunk_size = 20
-        if len(raw_data) > 0:
-            for i in range(0, len(raw_data), chunk_size):
-                chunk = raw_data[i:i + chunk_size]
-                unit_name = f"单元 {i//chunk_size + 1} ({i+1}-{min(i+chunk_size, len(raw_data))})"
-                processed_data[unit_name] = chunk
-        else: return []
-    elif isinstance(raw_data, dict):
-        processed_data = raw_data
-    else:
-        st.error("数据结构无法识别")
+    return Deck.from_raw([{"word": f"Demo {i}", "meaning": f"示例 {i}", "example": "Test", "example_cn": "测试"} for i in range(1, 45)])
+
+def process_data_selection(deck):
+    if not deck.unit_names: return []
+
+    st.sidebar.subheader("📚 单元选择")
+    report = deck.merge_report
+    if report and report.removed:
+        st.sidebar.caption(f"已合并 {report.removed} 条重复词条（{report.entries_in} → {report.entries_out}）")
+    all_units = deck.unit_names
+    # 优先恢复上次保存的单元选择
+    unit_set = set(all_units)
+    default_selections = [u for u in st.session_state.get('restored_units', []) if u in unit_set]
+    if not default_selections: default_selections = [all_units[0]] if all_units else []
+    # 每本书、每次搜索跳转各用一个控件 key，保证默认选择能生效
+    selected_units = st.sidebar.multiselect(f"选择范围 (共 {len(all_units)} 单元):", options=all_units, default=default_selections,
+                                            key=f"units:{book_id}:{st.session_state.get('jump_seq', 0)}")
+    if not selected_units:
+        st.warning("⚠️ 请至少勾选一个单元！")
         return []
+    # 只返回所选单元的区间视图，卡片在读取时才生成
+    return deck.select(selected_units)
 
-    if processed_data:
-        st.sidebar.subheader("📚 单元选择")
-        all_units = list(processed_data.keys())
-        default_selections = [all_units[0]] if all_units else []
-        selected_units = st.sidebar.multiselect(f"选择范围 (共 {len(all_units)} 单元):", options=all_units, default=default_selections)
-        if not selected_units:
-            st.warning("⚠️ 请至少勾选一个单元！")
-            return []
-        for unit in selected_units:
-            for word_item in processed_data[unit]:
-                new_item = word_item.copy()
-                new_item['source_unit'] = unit
-                final_list.append(new_item)
-    return final_list
-
-raw_data_content = load_raw_data()
-words = process_data_selection(raw_data_content)
+with metrics.timer("stage_seconds", stage="load_raw_data"):
+    deck = load_raw_data()
+with metrics.timer("stage_seconds", stage="process_data_selection"):
+    words = process_data_selection(deck)
 
 if not words: st.stop()
 if st.session_state.current_index >= len(words): st.session_state.current_index = 0
@@ -336,70 +486,267 @@ if st.session_state.current_index >= len(words): st.session_state.current_index
 idx = st.session_state.current_index
 current_word = words[idx]
 
+def current_card():
+    # 卡片区和练习区是局部重跑的片段，不能用整页重跑时算好的 idx/current_word
+    i = st.session_state.current_index
+    if i >= len(words): i = st.session_state.current_index = 0
+    return i, words[i]
+
+# --- 间隔重复 ---
+def get_review_queue():
+    sched = st.session_state.srs.get(book_id)
+    if sched is None or len(sched) != len(deck):
+        saved = get_progress_store().load(user_id, book_id) or {}
+        try: sched = Scheduler.from_bytes(saved["srs"], len(deck))
+        except (KeyError, TypeError, ValueError): sched = Scheduler(len(deck))
+        st.session_state.srs[book_id] = sched
+    # 队列只在换书/换单元时重建
+    queue_key = (book_id, id(deck), words.key)
+    if st.session_state.get('srs_queue_key') != queue_key:
+        st.session_state.srs_queue = ReviewQueue(sched, words)
+        st.session_state.srs_queue_key = queue_key
+    return st.session_state.srs_queue
+
+def record_review(grade):
+    i = st.session_state.current_index
+    queue = get_review_queue()
+    queue.record(i, grade)
+    store = get_progress_store()
+    store.log_review(user_id, book_id, words.locate(i)[0], grade)
+    store.save(user_id, book_id, srs=queue.scheduler.to_bytes())
+
+def next_card_index():
+    i = st.session_state.current_index
+    if srs_enabled:
+        return get_review_queue().next_index(exclude=i)
+    if shuffle_enabled and len(words) > 1:
+        # 直接在视图的下标区间上抽样，不生成所选单元的完整列表
+        return words.sample(1, exclude=i)[0]
+    return (i + 1) % len(words)
+
+def save_progress():
+    # 位置/得分/单元交给进度库，未变化时不产生写入
+    get_progress_store().save(user_id, book_id, position=st.session_state.current_index,
+                              score=st.session_state.quiz_score, units=list(words.units))
+
+if srs_enabled:
+    queue = get_review_queue()
+    st.sidebar.caption(f"🧠 待复习 {queue.due_count()} 张 · 已学 {queue.scheduler.reviewed} 张")
+
 # --- 功能函数 ---
+@st.cache_resource
+def get_audio_cache():
+    # 磁盘发音缓存，所有会话共享
+    backend = Timed(GTTSBackend(), "synthesize", "tts", get_metrics())
+    cache = AudioCache(os.environ.get("AUDIO_CACHE_DIR", ".audio_cache"), max_bytes=200 * 1024 * 1024, backend=backend)
+    get_metrics().add_collector("audio_cache", cache.stats)
+    return cache
+
+@st.cache_resource
+def get_audio_prefetcher():
+    return AudioPrefetcher(get_audio_cache(), max_workers=4)
+
+PREFETCH_AHEAD = 5
+
+def prefetch_upcoming_audio(start=None, count=PREFETCH_AHEAD + 1):
+    # 当前卡片及后面几张的发音放到后台生成，不阻塞本次重跑
+    i = st.session_state.current_index if start is None else start
+    upcoming = [words.word_at((i + k) % len(words)) for k in range(min(count, len(words)))]
+    get_audio_prefetcher().prefetch(st.session_state.session_uid, (id(deck), words.key),
+                                    upcoming, LANG_CONFIG[selected_lang]['code'])
+
 def generate_audio(text, lang_code):
     if not text or not str(text).strip(): return None
     try:
-        tts = gTTS(text=str(text), lang=lang_code)
-        fp = BytesIO()
-        tts.write_to_fp(fp)
-        return fp.getvalue()
+        return get_audio_cache().get(text, lang_code)
     except Exception as e:
         st.error(f"语音生成失败: {e}")
         return None
 
-def get_ai_help():
+@st.cache_resource
+def get_ai_cache():
+    # AI 分析结果的磁盘缓存，所有会话共享
+    cache = AnalysisCache(os.environ.get("AI_CACHE_DIR", ".ai_cache"))
+    get_metrics().add_collector("ai_cache", cache.stats)
+    return cache
+
+@st.cache_resource(max_entries=16)
+def gemini_backend(api_key):
+    # 每个 Key 只创建一次客户端（绑定在 GeminiBackend 上，不经过全局的 genai.configure）
+    return Timed(GeminiBackend(api_key), ("generate", "generate_stream"), "gemini", get_metrics())
+
+def show_ai_fields(slots, res, final=True):
+    # 流式接收时只画已经到达的字段，结束后缺的字段显示“暂无”
+    if final or 'root' in res: slots[0].success(f"💡 **词源**: {res.get('root', '暂无')}")
+    if final or 'mnemonic' in res: slots[1].info(f"🧠 **助记**: {res.get('mnemonic', '暂无')}")
+    if final or 'scenario' in res:
+        slots[2].warning(f"💬 **场景**: {res.get('scenario', '暂无')}\n\n*{res.get('scenario_cn', '')}*")
+
+def get_ai_help(slots):
     if not api_key:
         st.warning("请在侧边栏输入 API Key")
         return
+    st.session_state.ai_audio_bytes = None
+    config = LANG_CONFIG[selected_lang]
+    card = current_card()[1]
+    received = {}
+    started = time.perf_counter()
+
+    def on_field(key, value):
+        if not received:
+            metrics.histogram("ai_first_field_seconds", "AI 助学首个字段到达耗时").observe(time.perf_counter() - started)
+        received[key] = value
+        show_ai_fields(slots, received, final=False)
+
     try:
-        st.session_state.ai_audio_bytes = None
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash-preview-09-2025')
-        prompt = f"""
-        作为{LANG_CONFIG[selected_lang]['prompt']}，请分析单词 "{current_word['word']}" (含义: {current_word['meaning']})。
-        请以纯 JSON 格式返回，包含字段：root (词源), mnemonic (助记), scenario (短对话), scenario_cn (翻译)。
-        """
-        response = model.generate_content(prompt)
-        match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if match:
-            st.session_state.ai_analysis = json.loads(match.group())
+        result = get_ai_cache().analyze_stream(gemini_backend(api_key), config['code'], config['prompt'],
+                                               card['word'], card['meaning'], on_field=on_field)
+    except Exception as e:
+        result = received
+        if not received:
+            st.error(f"AI 响应错误: {e}")
+            return
+    if not result:
+        st.error("AI 响应超时，请稍后重试")
+        return
+    if not all(field in result for field in AI_FIELDS):
+        st.warning("AI 回答不完整（超时或格式有误），先显示已收到的部分")
+    st.session_state.ai_analysis = result
+
+def analyze_current_unit():
+    # 整个单元一次请求，结果写入缓存，之后逐词点击 AI 助学直接命中
+    if not api_key:
+        st.sidebar.warning("请在侧边栏输入 API Key")
+        return
+    try:
+        config = LANG_CONFIG[selected_lang]
+        items = [(deck.words[i], deck.meanings[i]) for i in deck.unit_entries(current_word['source_unit'])]
+        results = get_ai_cache().analyze_batch(gemini_backend(api_key), config['code'], config['prompt'], items)
+        st.sidebar.success(f"已分析 {len(results)}/{len(items)} 个单词")
     except Exception as e:
-        st.error(f"AI 响应错误: {e}")
+        st.sidebar.error(f"AI 响应错误: {e}")
 
 # --- 练习模式辅助 ---
 def init_quiz_options():
     st.session_state.quiz_options = []
-    options = [current_word]
-    other_words = [w for w in words if w['word'] != current_word['word']]
+    i, card = current_card()
+    options = [card]
+    # 干扰项来自按词库预建的索引：释义相近、同单元优先，且互不同义
+    answer, unit = words.locate(i)
     count_needed = 3
-    if len(other_words) < count_needed:
-        if len(other_words) == 0:
-             distractors = [{"word": "N/A", "meaning": "无干扰项"}] * 3
-        else:
-             distractors = (other_words * (count_needed // len(other_words) + 1))[:count_needed]
+    picked = distractor_index(deck).pick(answer, unit, count_needed)
+    if len(picked) == 0:
+        distractors = [{"word": "N/A", "meaning": "无干扰项"}] * 3
     else:
-        distractors = random.sample(other_words, count_needed)
+        distractors = [deck.card(i) for i in (picked * (count_needed // len(picked) + 1))[:count_needed]]
     options.extend(distractors)
     random.shuffle(options)
     st.session_state.quiz_options = options
 
 def check_answer(selected_option):
-    is_correct = selected_option['word'] == current_word['word']
+    is_correct = selected_option['word'] == current_card()[1]['word']
     st.session_state.quiz_correct = is_correct
     if is_correct: st.session_state.quiz_score += 10
+    record_review(GRADE_GOOD if is_correct else GRADE_AGAIN)
     st.session_state.audio_bytes = None
     st.session_state.quiz_answered = True
 
 def next_quiz():
-    st.session_state.current_index = (st.session_state.current_index + 1) % len(words)
+    st.session_state.current_index = next_card_index()
     st.session_state.quiz_answered = False
     st.session_state.quiz_options = [] 
     st.session_state.audio_bytes = None
-    rerun()
+
+# --- 卡片操作（按钮回调，执行完只重跑所在片段） ---
+def go_to_card(index):
+    st.session_state.current_index = index
+    st.session_state.flipped = False
+    st.session_state.ai_analysis = None
+    st.session_state.audio_bytes = None
+    st.session_state.ai_audio_bytes = None
+
+def prev_card():
+    go_to_card((st.session_state.current_index - 1) % len(words))
+
+def next_card():
+    go_to_card(next_card_index())
+
+def flip_card():
+    st.session_state.flipped = not st.session_state.flipped
+
+def rate_card(grade):
+    # 翻面后自评，记入复习计划并进入下一张
+    record_review(grade)
+    next_card()
+
+# --- 浏览器端翻卡 ---
+def apply_card_nav():
+    # 前端成批回传的自评和作答依次记入复习计划，再同步位置和翻面状态
+    batch = new_batch(st.session_state.get("card_nav"), st.session_state.get('card_nav_seq', 0))
+    if batch is None: return
+    st.session_state.card_nav_seq = batch['seq']
+    if batch.get('resend'):
+        # 组件重新挂载后本地没有卡片，下次重跑整单元重发
+        st.session_state.card_nav_cards_key = None
+        return
+    for event in batch.get('events') or []:
+        i = event.get('index')
+        if not isinstance(i, int) or not 0 <= i < len(words): continue
+        st.session_state.current_index = i
+        if event.get('type') == 'rate':
+            record_review(GRADE_GOOD if event.get('grade') == GRADE_GOOD else GRADE_AGAIN)
+        elif event.get('type') == 'answer':
+            if event.get('correct') is True: st.session_state.quiz_score += 10
+            record_review(GRADE_GOOD if event.get('correct') is True else GRADE_AGAIN)
+    position = batch.get('position')
+    if isinstance(position, int) and 0 <= position < len(words):
+        go_to_card(position)
+    st.session_state.flipped = bool(batch.get('flipped'))
+
+def quiz_choices(i):
+    # 本会话内同一张卡的选项固定，重跑时不会在用户眼前换掉
+    rng = random.Random(f"{st.session_state.session_uid}:{i}")
+    answer, unit = words.locate(i)
+    picked = distractor_index(deck).pick(answer, unit, 3, rng=rng)
+    meanings = [deck.meanings[p] for p in (picked * 3)[:3]] or ["无干扰项"] * 3
+    k = rng.randrange(4)
+    meanings.insert(k, deck.meanings[answer])
+    return meanings, k
+
+def render_card_nav(mode):
+    apply_card_nav()
+    i = st.session_state.current_index
+    save_progress()
+    start, stop, _ = words.unit_span(i)
+    # 整个单元连同下一单元开头的发音一起预取，下次发来的单元就能带上音频
+    prefetch_upcoming_audio(start, stop - start + PREFETCH_AHEAD)
+    config = LANG_CONFIG[selected_lang]
+    audio_cache = get_audio_cache()
+    payload = build_payload(words, i, mode, config['code'], config['label'],
+                            seq=st.session_state.get('card_nav_seq', 0), score=st.session_state.quiz_score,
+                            flipped=st.session_state.flipped,
+                            audio_lookup=lambda text: audio_cache.lookup(text, config['code']),
+                            quiz_options=quiz_choices if mode == "quiz" else None,
+                            grades={"again": GRADE_AGAIN, "good": GRADE_GOOD},
+                            audio_ready=lambda text: audio_cache.contains(text, config['code']),
+                            sent_key=st.session_state.get('card_nav_cards_key'))
+    card_nav(payload, key="card_nav")
+    st.session_state.card_nav_cards_key = payload['cards_key']
 
 # --- 主界面 ---
-if mode == "📖 卡片学习":
+# 卡片区和练习区是 st.fragment：翻卡、上/下一张、作答只重跑片段本身，
+# 样式、侧边栏和词库加载只在换书、换语言、改单元等整页重跑时执行。
+@st.fragment
+def card_view():
+    with metrics.timer("stage_seconds", stage="card_fragment"):
+        if client_nav: render_card_nav("card")
+        else: render_card_view()
+
+def render_card_view():
+    idx, current_word = current_card()
+    save_progress()
+    prefetch_upcoming_audio()
+
     progress = (idx + 1) / len(words)
     st.progress(progress)
     
@@ -407,13 +754,7 @@ if mode == "📖 卡片学习":
     
     with c_left:
         st.markdown('<div class="nav-btn-container">', unsafe_allow_html=True)
-        if st.button("❮", help="上一个"):
-            st.session_state.current_index = (idx - 1) % len(words)
-            st.session_state.flipped = False
-            st.session_state.ai_analysis = None
-            st.session_state.audio_bytes = None
-            st.session_state.ai_audio_bytes = None
-            rerun()
+        st.button("❮", help="上一个", on_click=prev_card)
         st.markdown('</div>', unsafe_allow_html=True)
 
     with c_card:
@@ -432,9 +773,12 @@ if mode == "📖 卡片学习":
             example_html = ""
             example_text = current_word.get("example", "")
             if example_text and str(example_text).strip():
+                # 合并后的多条例句以换行分隔
+                example_origin = str(example_text).replace("\n", "<br>")
+                example_trans = str(current_word.get("example_cn") or "").replace("\n", "<br>")
                 example_html = f"""<div class="example-box">
-    <div class="example-origin">{example_text}</div>
-    <div class="example-trans">{current_word.get("example_cn","")}</div>
+    <div class="example-origin">{example_origin}</div>
+    <div class="example-trans">{example_trans}</div>
 </div>"""
             card_html = f"""<div class="word-card-container">
     {unit_tag_html}
@@ -446,20 +790,18 @@ if mode == "📖 卡片学习":
         
         st.markdown('<div class="flip-btn-container">', unsafe_allow_html=True)
         btn_txt = "🔄 翻转卡片" if not st.session_state.flipped else "↩️ 返回正面"
-        if st.button(btn_txt, use_container_width=True):
-            st.session_state.flipped = not st.session_state.flipped
-            rerun()
+        st.button(btn_txt, use_container_width=True, on_click=flip_card)
         st.markdown('</div>', unsafe_allow_html=True)
 
+        if st.session_state.flipped:
+            r_again, r_good = st.columns(2)
+            for col, label, grade in ((r_again, "😵 没记住", GRADE_AGAIN), (r_good, "😀 记住了", GRADE_GOOD)):
+                with col:
+                    st.button(label, key=f"rate_{grade}", use_container_width=True, on_click=rate_card, args=(grade,))
+
     with c_right:
         st.markdown('<div class="nav-btn-container">', unsafe_allow_html=True)
-        if st.button("❯", help="下一个"):
-            st.session_state.current_index = (idx + 1) % len(words)
-            st.session_state.flipped = False
-            st.session_state.ai_analysis = None
-            st.session_state.audio_bytes = None
-            st.session_state.ai_audio_bytes = None
-            rerun()
+        st.button("❯", help="下一个", on_click=next_card)
         st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div style="height: 1px; background-color: rgba(0,0,0,0.05); margin: 15px 0 15px 0;"></div>', unsafe_allow_html=True)
@@ -472,23 +814,24 @@ if mode == "📖 卡片学习":
                 audio_data = generate_audio(current_word['word'], LANG_CONFIG[selected_lang]['code'])
                 if audio_data:
                     st.session_state.audio_bytes = audio_data
-                    rerun()
         st.markdown('</div>', unsafe_allow_html=True)
         if st.session_state.audio_bytes:
             st.audio(st.session_state.audio_bytes, format="audio/mpeg", start_time=0)
     
     with col_b:
         st.markdown('<div class="func-btn-container">', unsafe_allow_html=True)
-        if st.button("✨ AI 助学", use_container_width=True):
-            with st.spinner("..."):
-                get_ai_help()
+        ai_clicked = st.button("✨ AI 助学", use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
+    # 分析结果边收边画在这几个占位里
+    ai_slots = [st.empty() for _ in range(3)]
+    if ai_clicked:
+        with st.spinner("..."):
+            get_ai_help(ai_slots)
+
     if st.session_state.ai_analysis:
         res = st.session_state.ai_analysis
-        st.success(f"💡 **词源**: {res.get('root', '暂无')}")
-        st.info(f"🧠 **助记**: {res.get('mnemonic', '暂无')}")
-        st.warning(f"💬 **场景**: {res.get('scenario', '暂无')}\n\n*{res.get('scenario_cn', '')}*")
+        show_ai_fields(ai_slots, res)
         
         st.markdown('<div class="ai-audio-btn">', unsafe_allow_html=True)
         if st.button("🔊 播放对话", key="ai_play"):
@@ -496,13 +839,22 @@ if mode == "📖 卡片学习":
                 scenario_text = res.get('scenario', '')
                 if scenario_text:
                     st.session_state.ai_audio_bytes = generate_audio(scenario_text, LANG_CONFIG[selected_lang]['code'])
-                    rerun()
         st.markdown('</div>', unsafe_allow_html=True)
         
         if st.session_state.ai_audio_bytes:
             st.audio(st.session_state.ai_audio_bytes, format="audio/mpeg")
 
-else:
+@st.fragment
+def quiz_view():
+    with metrics.timer("stage_seconds", stage="quiz_fragment"):
+        if client_nav: render_card_nav("quiz")
+        else: render_quiz_view()
+
+def render_quiz_view():
+    idx, current_word = current_card()
+    save_progress()
+    prefetch_upcoming_audio()
+
     is_options_valid = False
     if st.session_state.quiz_options:
         if any(opt['word'] == current_word['word'] for opt in st.session_state.quiz_options):
@@ -520,9 +872,8 @@ else:
         col1, col2 = st.columns(2)
         for i, option in enumerate(options):
             with (col1 if i % 2 == 0 else col2):
-                if st.button(option["meaning"], key=f"quiz_opt_{i}", use_container_width=True):
-                    check_answer(option)
-                    rerun()
+                st.button(option["meaning"], key=f"quiz_opt_{i}", use_container_width=True,
+                          on_click=check_answer, args=(option,))
     else:
         if st.session_state.quiz_correct:
             st.success(f"✅ 正确！\n\n**{current_word['word']}** = **{current_word['meaning']}**")
@@ -536,3 +887,23 @@ else:
         
         st.button("➡️ 下一题", type="primary", on_click=next_quiz, use_container_width=True)
 
+stage_timer = metrics.timer("stage_seconds", stage="render")
+if mode == "📖 卡片学习":
+    if st.sidebar.button("📦 AI 预分析当前单元", use_container_width=True):
+        with st.spinner("..."):
+            analyze_current_unit()
+    card_view()
+else:
+    quiz_view()
+
+stage_timer.stop()
+rerun_timer.stop()
+
+# --- 调试面板 ---
+# 地址栏加 ?debug=1 或设置 DEBUG_PANEL 环境变量时显示
+if st.query_params.get("debug") == "1" or os.environ.get("DEBUG_PANEL"):
+    with st.sidebar.expander("⏱️ 性能统计", expanded=True):
+        st.table(metrics.rows())
+        for name, cache in (("词库", get_deck_cache()), ("发音", get_audio_cache()), ("AI", get_ai_cache())):
+            stats = cache.stats()
+            st.caption(f"{name}缓存：命中 {stats['hits']} · 未命中 {stats['misses']}")
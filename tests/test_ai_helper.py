@@ -0,0 +1,134 @@
+import threading
+
+import pytest
+
+from ai_helper import FIELDS, AnalysisCache, AnalysisError, FakeModel
+
+
+class ScriptedModel:
+    """按给定的文本块流式返回，不看提示词。"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    def generate_stream(self, prompt, timeout=None):
+        self.calls += 1
+        yield from self.chunks
+
+
+def run_threads(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_concurrent_analyze_requests_once(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    model = FakeModel(delay=0.1)
+    results = []
+    run_threads(8, lambda: results.append(cache.analyze(model, "ko", "老师", "학교", "学校")))
+    assert model.calls == 1
+    assert all(r == results[0] for r in results)
+    assert cache.stats()["inflight"] == 0
+    # 第二次走缓存
+    assert cache.analyze(model, "ko", "老师", "학교", "学校") == results[0]
+    assert model.calls == 1
+
+
+def test_batch_requests_only_missing_words(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    model = FakeModel()
+    cache.analyze(model, "ko", "老师", "학교", "学校")
+    results = cache.analyze_batch(model, "ko", "老师", [("학교", "学校"), ("친구", "朋友"), ("집", "家")])
+    assert sorted(results) == ["집", "친구", "학교"]
+    assert model.calls == 2
+    assert cache.get("ko", "집", "家") == results["집"]
+    assert cache.stats()["inflight"] == 0
+
+
+def test_concurrent_stream_requests_once(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    model = FakeModel(delay=0.1, chunk_size=8)
+    results = []
+    run_threads(4, lambda: results.append(cache.analyze_stream(model, "ko", "老师", "학교", "学校")))
+    assert model.calls == 1
+    assert all(sorted(r) == sorted(FIELDS) for r in results)
+
+
+def test_stream_reports_fields_in_order(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    seen = []
+    result = cache.analyze_stream(FakeModel(chunk_size=5), "ko", "老师", "학교", "学校",
+                                  on_field=lambda key, value: seen.append(key))
+    assert seen == list(result)
+    assert cache.get("ko", "학교", "学校") == result
+
+
+def test_partial_stream_is_returned_but_not_cached(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    model = ScriptedModel(['```json\n{"root": "词源", "mnemo', 'nic": "助'])
+    result = cache.analyze_stream(model, "ko", "老师", "학교", "学校")
+    assert result == {"root": "词源"}
+    assert cache.get("ko", "학교", "学校") is None
+    assert cache.stats()["partial"] == 1
+    cache.analyze_stream(model, "ko", "老师", "학교", "学校")
+    assert model.calls == 2
+
+
+def test_stream_falls_back_to_whole_reply(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    # 流式解析遇到空对象时改为整体解析，空对象算残缺结果
+    assert cache.analyze_stream(ScriptedModel(["{}"]), "ko", "老师", "학교", "学校") == {}
+    with pytest.raises(AnalysisError):
+        cache.analyze_stream(ScriptedModel(["I cannot answer."]), "ko", "老师", "학교", "学校")
+    assert cache.stats()["inflight"] == 0
+
+
+def test_interrupted_callback_releases_word(tmp_path):
+    class Rerun(BaseException):
+        pass
+
+    def on_field(key, value):
+        raise Rerun()
+
+    cache = AnalysisCache(str(tmp_path))
+    model = FakeModel(chunk_size=8)
+    with pytest.raises(Rerun):
+        cache.analyze_stream(model, "ko", "老师", "학교", "学校", on_field=on_field)
+    assert cache.stats()["inflight"] == 0
+    result = cache.analyze_stream(model, "ko", "老师", "학교", "学校", timeout=5)
+    assert sorted(result) == sorted(FIELDS)
+
+
+def test_stream_timeout_returns_fields_so_far(tmp_path):
+    stalled = threading.Event()
+
+    class StalledModel:
+        def generate_stream(self, prompt, timeout=None):
+            yield '{"root": "词源", "mnemonic": "助'
+            stalled.wait(5)
+
+    cache = AnalysisCache(str(tmp_path))
+    try:
+        result = cache.analyze_stream(StalledModel(), "ko", "老师", "학교", "学校", timeout=0.2)
+    finally:
+        stalled.set()
+    assert result == {"root": "词源"}
+    assert cache.stats()["timeouts"] == 1
+    assert cache.get("ko", "학교", "学校") is None
+    assert cache.stats()["inflight"] == 0
+
+
+def test_gemini_backends_keep_their_own_key():
+    genai = pytest.importorskip("google.generativeai")
+    from ai_helper import GeminiBackend
+
+    first = GeminiBackend("key-a")
+    second = GeminiBackend("key-b")
+    # 别的会话改了全局配置也不影响已建好的后端
+    genai.configure(api_key="key-c")
+    assert first.model._client._transport._credentials.token == "key-a"
+    assert second.model._client._transport._credentials.token == "key-b"
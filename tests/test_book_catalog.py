@@ -0,0 +1,82 @@
+import json
+import os
+
+from book_catalog import Catalog
+from deck_cache import DeckCache
+
+
+def write_book(directory, name, words):
+    path = os.path.join(str(directory), name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"word": w, "meaning": "意思"} for w in words], f, ensure_ascii=False)
+    return os.path.normpath(path)
+
+
+def make_catalog(tmp_path, **kwargs):
+    # 清单放在词库目录外面，写清单不会改变词库目录的 mtime
+    return Catalog(DeckCache(), str(tmp_path), ("words_",), str(tmp_path.parent / (tmp_path.name + ".catalog.json")),
+                   poll_interval=0, **kwargs)
+
+
+def test_polls_only_changed_books(tmp_path, monkeypatch):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    ko = write_book(tmp_path, "words_ko.json", ["학교", "학교", "친구"])
+    th = write_book(tmp_path, "words_th.json", ["โรงเรียน"])
+    write_book(tmp_path, "words_ko_book.json.ckpt.json", [])
+    write_book(tmp_path, "notes.json", ["x"])
+    catalog = make_catalog(tmp_path)
+    assert sorted(catalog.refresh()) == [ko, th]
+    info = catalog.get(ko)
+    assert (info.entries, info.distinct, info.units) == (3, 2, 1)
+    assert [b.path for b in catalog.books("words_ko")] == [ko]
+
+    # 什么都没变：不列目录，也不解析
+    scans, parsed = catalog.scans, catalog.parsed
+    assert catalog.refresh() == []
+    assert (catalog.scans, catalog.parsed) == (scans, parsed)
+
+    # 原地改写只重新解析这一本
+    write_book(tmp_path, "words_th.json", ["โรงเรียน", "เพื่อน"])
+    assert catalog.refresh() == [th]
+    assert catalog.scans == scans and catalog.parsed == parsed + 1
+    assert catalog.get(th).distinct == 2
+
+    # 增删文件会重新列目录
+    os.remove(ko)
+    fr = write_book(tmp_path, "words_fr.json", ["école"])
+    assert sorted(catalog.refresh()) == [fr, ko]
+    assert catalog.scans == scans + 1
+    assert catalog.get(ko) is None
+
+
+def test_poll_interval_limits_refreshes(tmp_path, monkeypatch):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    catalog = Catalog(DeckCache(), str(tmp_path), ("words_",), poll_interval=3600)
+    catalog.refresh()
+    path = write_book(tmp_path, "words_ko.json", ["학교"])
+    assert catalog.refresh() == []
+    assert catalog.refresh(force=True) == [path]
+
+
+def test_broken_book_does_not_stop_polling(tmp_path, monkeypatch):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    ko = write_book(tmp_path, "words_ko.json", ["학교"])
+    bad = os.path.normpath(str(tmp_path / "words_th.json"))
+    with open(bad, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    catalog = make_catalog(tmp_path)
+    assert sorted(catalog.refresh()) == [ko, bad]
+    assert catalog.get(bad).error and catalog.get(bad).label().endswith("（无法解析）")
+    assert catalog.get(ko).error is None
+
+
+def test_manifest_survives_restart(tmp_path, monkeypatch):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    ko = write_book(tmp_path, "words_ko.json", ["학교", "친구"])
+    make_catalog(tmp_path, compile_decks=True).refresh()
+    assert os.listdir(tmp_path / "decks") == ["words_ko.deck"]
+    catalog = make_catalog(tmp_path)
+    # 重启后直接用清单里的元数据，stat 没变的书不再解析
+    assert catalog.get(ko).distinct == 2
+    assert catalog.refresh() == []
+    assert catalog.parsed == 0
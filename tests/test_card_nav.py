@@ -0,0 +1,52 @@
+from card_nav import build_payload, new_batch
+from deck import Deck
+
+BOOK = {
+    "第一课": [{"word": "학교", "meaning": "学校"}, {"word": "친구", "meaning": "朋友"}],
+    "第二课": [{"word": "사과", "meaning": "苹果", "example": "사과를 먹어요.", "example_cn": "吃苹果。"}],
+}
+
+
+def test_new_batch():
+    assert new_batch(None, 0) is None
+    assert new_batch({"seq": "3"}, 0) is None
+    assert new_batch({"seq": 2}, 2) is None
+    batch = {"seq": 3, "events": []}
+    assert new_batch(batch, 2) is batch
+
+
+def test_payload_covers_current_unit():
+    view = Deck.from_raw(BOOK).select(["第一课", "第二课"])
+    payload = build_payload(view, 2, "flash", "ko", "韩语", audio_lookup=lambda text: b"mp3" if text == "사과" else None)
+    assert (payload["unit"], payload["start"], payload["position"], payload["total"]) == ("第二课", 2, 0, 3)
+    assert payload["speech_lang"] == "ko-KR"
+    [card] = payload["cards"]
+    assert card["example_cn"] == "吃苹果。"
+    assert card["audio"].startswith("data:audio/mpeg;base64,")
+
+
+def test_cards_sent_only_when_key_changes():
+    view = Deck.from_raw(BOOK).select(["第一课", "第二课"])
+    ready = set()
+    lookups = []
+
+    def payload(index, sent_key=None):
+        return build_payload(view, index, "flash", "ko", "韩语", sent_key=sent_key,
+                             audio_lookup=lambda text: lookups.append(text),
+                             audio_ready=lambda text: text in ready)
+
+    first = payload(0)
+    assert [c["word"] for c in first["cards"]] == ["학교", "친구"]
+    # 同一单元内翻卡：卡片已经在前端，不再重发也不再查发音
+    lookups.clear()
+    second = payload(1, sent_key=first["cards_key"])
+    assert second["cards"] is None and second["token"] == first["token"] and second["position"] == 1
+    assert lookups == []
+    # 又有发音生成好了，cards_key 变化，重新发送这个单元
+    ready.add("친구")
+    third = payload(1, sent_key=first["cards_key"])
+    assert third["cards_key"] != first["cards_key"] and len(third["cards"]) == 2
+    # 换到练习模式 token 也会变，前端不沿用翻卡模式的本地位置
+    quiz = build_payload(view, 0, "quiz", "ko", "韩语", quiz_options=lambda i: (["a", "b", "c", "d"], 0))
+    assert quiz["token"] != first["token"]
+    assert quiz["cards"][0]["options"] == ["a", "b", "c", "d"]
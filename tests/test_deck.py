@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from deck import Deck
+
+RAW = [{"word": f"w{i}", "meaning": f"m{i}", "example": f"e{i}"} for i in range(45)]
+
+
+def test_list_book_is_chunked_into_units():
+    deck = Deck.from_raw(RAW)
+    assert len(deck) == 45
+    assert deck.unit_names == ["单元 1 (1-20)", "单元 2 (21-40)", "单元 3 (41-45)"]
+    assert list(deck.unit_entries("单元 3 (41-45)")) == [40, 41, 42, 43, 44]
+    assert deck.card(3, "单元 1 (1-20)") == {"word": "w3", "meaning": "m3", "example": "e3", "example_cn": "",
+                                            "source_unit": "单元 1 (1-20)"}
+
+
+def test_missing_fields_and_bad_structure():
+    deck = Deck.from_raw({"第一课": [{"word": "학교"}]})
+    assert deck.card(0) == {"word": "학교", "meaning": "", "example": "", "example_cn": ""}
+    with pytest.raises(ValueError):
+        Deck.from_raw("not a book")
+    with pytest.raises(ValueError):
+        Deck.from_raw({"第一课": ["학교"]})
+
+def test_view_indexes_selected_units():
+    deck = Deck.from_raw(RAW)
+    view = deck.select(["单元 3 (41-45)", "单元 1 (1-20)"])
+    assert len(view) == 25
+    assert view[0]["word"] == "w40" and view[0]["source_unit"] == "单元 3 (41-45)"
+    assert view.locate(5) == (0, "单元 1 (1-20)")
+    assert view.locate(-1) == (19, "单元 1 (1-20)")
+    assert view.unit_span(7) == (5, 25, "单元 1 (1-20)")
+    # 顺序翻卡和随机跳转的结果一致
+    assert [view.word_at(i) for i in (24, 3, 6, 0)] == ["w19", "w43", "w1", "w40"]
+    assert list(view.iter_words()) == [card["word"] for card in view]
+    with pytest.raises(IndexError):
+        view.locate(25)
+    assert deck.select(["单元 3 (41-45)", "单元 1 (1-20)"]) is view
+
+
+def test_sample_skips_excluded_index():
+    view = Deck.from_raw(RAW).select(["单元 3 (41-45)"])
+    rng = random.Random(7)
+    for exclude in range(5):
+        picked = view.sample(3, rng=rng, exclude=exclude)
+        assert len(picked) == len(set(picked)) == 3
+        assert exclude not in picked and all(0 <= i < 5 for i in picked)
+    # 不足 k 个时返回其余全部
+    assert sorted(view.sample(10, rng=rng, exclude=2)) == [0, 1, 3, 4]
+    assert sorted(view.sample(10, rng=rng)) == [0, 1, 2, 3, 4]
+    # 越界的 exclude 不影响抽样范围
+    assert sorted(view.sample(10, rng=rng, exclude=5)) == [0, 1, 2, 3, 4]
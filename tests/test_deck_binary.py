@@ -0,0 +1,42 @@
+import json
+import os
+
+import pytest
+
+from deck import Deck
+from deck_binary import compile_book, compiled_path, load_compiled
+
+LIST_BOOK = [
+    {"word": "학교", "meaning": "学校", "example": "학교에 가요.", "example_cn": "去学校。"},
+    {"word": "학교", "meaning": "学校"},
+    {"word": "친구", "meaning": "朋友", "example": None},
+]
+UNIT_BOOK = {"第一课": LIST_BOOK[:2], "第二课": LIST_BOOK[2:], "空单元": []}
+
+
+@pytest.mark.parametrize("raw", [LIST_BOOK, UNIT_BOOK])
+def test_round_trip(tmp_path, monkeypatch, raw):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    path = str(tmp_path / "words_ko.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(raw, f, ensure_ascii=False)
+    assert compile_book(path) == compiled_path(path)
+
+    stat = os.stat(path)
+    book = load_compiled(path, stat.st_size, stat.st_mtime_ns)
+    assert book is not None
+    assert book.to_raw() == raw
+    deck = book.deck()
+    assert list(deck.words) == ["학교", "친구"]
+    assert deck.unit_names == Deck.from_raw(raw).unit_names
+    assert deck.merge_report.entries_in == 3
+
+
+def test_stale_deck_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    path = str(tmp_path / "words_ko.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(LIST_BOOK, f, ensure_ascii=False)
+    compile_book(path)
+    stat = os.stat(path)
+    assert load_compiled(path, stat.st_size + 1, stat.st_mtime_ns) is None
@@ -0,0 +1,45 @@
+import json
+import shutil
+import sys
+
+from deck_cache import DeckCache, load_book
+
+
+def write_book(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"word": f"단어{i}", "meaning": f"意思{i}", "example": "예문 " * 100} for i in range(n)], f,
+                  ensure_ascii=False)
+    return str(path)
+
+
+def test_size_is_estimated_from_columns(tmp_path, monkeypatch):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    cache = DeckCache()
+    deck = load_book(cache, write_book(tmp_path / "words_ko.json", 200))
+    assert cache.current_bytes == deck.nbytes()
+    # 每条例句相同，驻留后只算一份
+    example = deck.examples[0]
+    assert deck.nbytes() < sys.getsizeof(example) * len(deck)
+
+
+def test_evicts_by_estimated_size(tmp_path, monkeypatch):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    first = write_book(tmp_path / "words_ko.json", 100)
+    second = write_book(tmp_path / "words_th.json", 150)
+    probe = DeckCache()
+    limit = load_book(probe, first).nbytes() + load_book(probe, second).nbytes() - 1
+    cache = DeckCache(max_bytes=limit)
+    load_book(cache, first)
+    load_book(cache, second)
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["bytes"] <= limit
+
+
+def test_identical_files_load_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    path = write_book(tmp_path / "words_ko.json", 10)
+    copy = str(tmp_path / "words-ko.json")
+    shutil.copyfile(path, copy)
+    cache = DeckCache()
+    assert load_book(cache, path) is load_book(cache, copy)
+    assert cache.stats()["entries"] == 1
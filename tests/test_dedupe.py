@@ -0,0 +1,59 @@
+import time
+
+from deck import Deck
+from dedupe import dedupe_deck
+
+BOOK = {
+    "第一课": [
+        {"word": "학교 앞", "meaning": "学校前面 / 校门口", "example": "학교 앞에서 만나요.", "example_cn": "在学校前面见。"},
+        {"word": "친구", "meaning": "朋友"},
+    ],
+    "第二课": [
+        {"word": "학교  앞", "meaning": "学校前面", "example": "학교 앞에서 만나요.", "example_cn": "在学校前面见。"},
+        {"word": "학교 앞", "meaning": "校门口（口语）；门前", "example": "학교 앞 식당", "example_cn": "学校前面的饭馆"},
+        {"word": "사과", "meaning": "苹果"},
+    ],
+}
+
+
+def test_merges_duplicates_and_keeps_units():
+    deck = dedupe_deck(Deck.from_raw(BOOK))
+    assert list(deck.words) == ["학교 앞", "친구", "사과"]
+    # 义项按 meaning_parts 的分隔符拆开再取并集，括注不同的同一义项只留第一次
+    assert deck.meanings[0] == "学校前面；校门口；门前"
+    assert deck.examples[0] == "학교 앞에서 만나요.\n학교 앞 식당"
+    assert deck.examples_cn[0] == "在学校前面见。\n学校前面的饭馆"
+    assert [deck.card(p)["word"] for p in deck.unit_entries("第二课")] == ["학교 앞", "사과"]
+    report = deck.merge_report
+    assert (report.entries_in, report.entries_out, report.removed) == (5, 3, 2)
+    assert report.merged == [("학교 앞", 3, ["第一课", "第二课"])]
+
+
+def test_view_shows_each_word_once():
+    deck = dedupe_deck(Deck.from_raw(BOOK))
+    assert len(deck.select(["第二课"])) == 2
+    view = deck.select(["第一课", "第二课"])
+    assert [card["word"] for card in view] == ["학교 앞", "친구", "사과"]
+    assert len(view) == 3
+    assert view.locate(2) == (2, "第二课")
+    assert view.unit_span(2) == (2, 3, "第二课")
+    # 选择顺序决定词条算在哪个单元
+    assert [card["source_unit"] for card in deck.select(["第二课", "第一课"])] == ["第二课", "第二课", "第一课"]
+
+
+def test_linear_time():
+    def raw(n):
+        return [{"word": f"w{i % (n // 3)}", "meaning": f"义{i % 7}；释{i}"} for i in range(n)]
+
+    def best(data):
+        deck = Deck.from_raw(data)
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            dedupe_deck(deck)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    small, large = raw(10_000), raw(40_000)
+    # 平方级的实现放大 4 倍数据要慢 16 倍，留足抖动的余量
+    assert best(large) < best(small) * 10
@@ -0,0 +1,73 @@
+import json
+import os
+
+from ai_helper import FakeModel
+from enrich import enrich
+
+BOOK = [{"word": f"단어{i}", "meaning": f"释义{i}"} for i in range(10)] + [
+    {"word": "단어0", "meaning": "释义0"},
+    {"word": "단어1", "meaning": "释义1", "example": "예문", "example_cn": "例句"},
+]
+
+
+class FlakyModel(FakeModel):
+    """前 fail 次请求失败。"""
+
+    def __init__(self, fail):
+        super().__init__()
+        self.fail = fail
+
+    def generate(self, prompt):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("quota")
+        return super().generate(prompt)
+
+
+def write_book(tmp_path):
+    path = str(tmp_path / "words_ko_test.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(BOOK, f, ensure_ascii=False)
+    return path, str(tmp_path / "words_ko_test_enriched.json")
+
+
+def test_resume_skips_finished_words(tmp_path):
+    book, out = write_book(tmp_path)
+    first = FakeModel()
+    stats = enrich(book, out, first, "老师", batch=2, workers=1, per_minute=0, limit=4)
+    assert stats.words_done == 4
+    assert os.path.exists(out + ".ckpt.json")
+
+    second = FakeModel()
+    stats = enrich(book, out, second, "老师", batch=2, workers=1, per_minute=0)
+    assert second.calls == 3
+    assert stats.words_done == stats.words_total == 10
+    assert not os.path.exists(out + ".part") and not os.path.exists(out + ".ckpt.json")
+
+    with open(out, encoding="utf-8") as f:
+        items = json.load(f)
+    assert all(item["example"] and item["example_cn"] for item in items)
+    # 已有的例句和翻译保持不变
+    assert items[-1]["example"] == "예문" and items[-1]["example_cn"] == "例句"
+
+
+def test_failed_group_is_retried(tmp_path):
+    book, out = write_book(tmp_path)
+    stats = enrich(book, out, FlakyModel(fail=1), "老师", batch=5, workers=1, per_minute=0)
+    assert stats.failed == 5
+    assert stats.last_error == "RuntimeError: quota"
+    assert os.path.exists(out + ".ckpt.json")
+
+    retry = FakeModel()
+    stats = enrich(book, out, retry, "老师", batch=5, workers=1, per_minute=0)
+    assert retry.calls == 1
+    assert stats.failed == 0 and stats.words_done == 10
+
+
+def test_entries_with_different_examples_are_not_merged(tmp_path):
+    path = str(tmp_path / "words_ko_x.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"word": "가다", "meaning": "去", "example": "학교에 가다"},
+                   {"word": "가다", "meaning": "去", "example": "집에 가다"}], f, ensure_ascii=False)
+    stats = enrich(path, path + ".out", FakeModel(), "老师", per_minute=0)
+    assert stats.words_total == 2
@@ -0,0 +1,81 @@
+import pytest
+
+from metrics import Registry, Timed
+
+
+def test_render_prometheus_text():
+    registry = Registry(namespace="app")
+    fast = registry.histogram("stage_seconds", "阶段耗时", buckets=(0.1, 1.0), stage="load")
+    for value in (0.05, 0.5, 2.0):
+        fast.observe(value)
+    registry.histogram("stage_seconds", buckets=(0.1, 1.0), stage='say "hi"\n')
+    registry.counter("errors_total", "失败次数", call="tts").inc(2)
+    registry.add_collector("deck_cache", lambda: {"hits": 3, "bytes": 1.5, "ok": True, "name": "x"})
+    registry.add_collector("broken", lambda: 1 / 0)
+    assert registry.render().splitlines() == [
+        "# HELP app_errors_total 失败次数",
+        "# TYPE app_errors_total counter",
+        'app_errors_total{call="tts"} 2',
+        "# HELP app_stage_seconds 阶段耗时",
+        "# TYPE app_stage_seconds histogram",
+        'app_stage_seconds_bucket{stage="load",le="0.1"} 1',
+        'app_stage_seconds_bucket{stage="load",le="1.0"} 2',
+        'app_stage_seconds_bucket{stage="load",le="+Inf"} 3',
+        'app_stage_seconds_sum{stage="load"} 2.55',
+        'app_stage_seconds_count{stage="load"} 3',
+        'app_stage_seconds_bucket{stage="say \\"hi\\"\\n",le="0.1"} 0',
+        'app_stage_seconds_bucket{stage="say \\"hi\\"\\n",le="1.0"} 0',
+        'app_stage_seconds_bucket{stage="say \\"hi\\"\\n",le="+Inf"} 0',
+        'app_stage_seconds_sum{stage="say \\"hi\\"\\n"} 0.0',
+        'app_stage_seconds_count{stage="say \\"hi\\"\\n"} 0',
+        "# TYPE app_deck_cache_bytes gauge",
+        "app_deck_cache_bytes 1.5",
+        "# TYPE app_deck_cache_hits_total counter",
+        "app_deck_cache_hits_total 3",
+    ]
+
+
+def test_quantiles_and_rows():
+    registry = Registry()
+    histogram = registry.histogram("stage_seconds", buckets=(0.01, 0.1, 1.0), stage="quiz")
+    assert histogram.quantile(0.5) is None
+    for value in (0.005, 0.005, 0.05, 5.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 0.01
+    assert histogram.quantile(0.95) == 1.0
+    [row] = registry.rows()
+    assert row["指标"] == 'stage_seconds{stage="quiz"}' and row["次数"] == 4
+    with registry.timer("stage_seconds", buckets=(0.01, 0.1, 1.0), stage="quiz"):
+        pass
+    assert histogram.count == 5
+
+
+class Backend:
+    def synthesize(self, text):
+        if not text:
+            raise ValueError("empty")
+        return b"mp3"
+
+    def stream(self, parts):
+        for part in parts:
+            if part is None:
+                raise RuntimeError("interrupted")
+            yield part
+
+    name = "stub"
+
+
+def test_timed_counts_calls_and_errors():
+    registry = Registry()
+    backend = Timed(Backend(), ("synthesize", "stream"), "tts", registry)
+    assert backend.name == "stub"
+    assert backend.synthesize("가") == b"mp3"
+    with pytest.raises(ValueError):
+        backend.synthesize("")
+    # 流式方法计到迭代结束，中途出错也算一次失败
+    assert list(backend.stream(["a", "b"])) == ["a", "b"]
+    with pytest.raises(RuntimeError):
+        list(backend.stream(["a", None]))
+    histogram = registry.histogram("external_call_seconds", call="tts")
+    errors = registry.counter("external_call_errors_total", call="tts")
+    assert (histogram.count, errors.value) == (4, 2)
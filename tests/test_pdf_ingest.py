@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from pdf_ingest import available_output, extract_rows, ingest, output_name, parse_row
+
+pymupdf = pytest.importorskip("pymupdf")
+
+
+@pytest.mark.parametrize("line, lang, expected", [
+    ("학교\t学校", "ko", ("학교", "学校")),
+    ("학교 : 学校；校园", "ko", ("학교", "学校；校园")),
+    ("학교  学校", "ko", ("학교", "学校")),
+    ("학교学校", "ko", ("학교", "学校")),
+    ("école - 学校 (n.f.)", "fr", ("école", "学校 (n.f.)")),
+    ("学校（がっこう）学校", "ja", ("学校（がっこう）", "学校")),
+    ("학교에 가요.", "ko", None),
+    ("学校\t학교", "ko", None),
+    ("第一课", "ko", None),
+])
+def test_parse_row(line, lang, expected):
+    assert parse_row(line, lang) == expected
+
+
+def test_extract_rows_attaches_examples():
+    lines = ["第 1 课", "학교\t学校", "  학교에 가요.  ", "去学校。", "친구\t朋友", "去学校。", ""]
+    assert extract_rows(lines, "ko") == [
+        {"word": "학교", "meaning": "学校", "example": "학교에 가요.", "example_cn": "去学校。"},
+        {"word": "친구", "meaning": "朋友", "example": "", "example_cn": ""},
+    ]
+
+
+def make_pdf(path, pages):
+    doc = pymupdf.open()
+    for p in range(pages):
+        page = doc.new_page()
+        for i in range(3):
+            # 单词和释义之间留出大间距，page_lines 会把它变成制表符
+            page.insert_text((50, 72 + 24 * i), f"단어{p}-{i}", fontname="korea")
+            page.insert_text((200, 72 + 24 * i), f"释义{i}", fontname="china-s")
+    doc.save(str(path))
+    return str(path)
+
+
+def test_ingest_resumes_after_interruption(tmp_path):
+    pdf = make_pdf(tmp_path / "book.pdf", 4)
+    out = str(tmp_path / output_name(pdf, "ko"))
+    assert out.endswith("words_ko_book.json")
+
+    class Stop(Exception):
+        pass
+
+    def interrupt(stats):
+        if stats.pages_done >= 2:
+            raise Stop
+
+    with pytest.raises(Stop):
+        ingest(pdf, "ko", out, workers=1, batch=1, on_progress=interrupt)
+    with open(out + ".ckpt.json", encoding="utf-8") as f:
+        assert json.load(f)["next_page"] == 2
+    # 同一个 PDF 的未完成导入沿用原路径
+    assert available_output(out, pdf) == out
+
+    pages = []
+    stats = ingest(pdf, "ko", out, workers=1, batch=1, on_progress=lambda s: pages.append(s.pages_done))
+    assert pages == [3, 4]
+    assert stats.rows == 6
+    with open(out, encoding="utf-8") as f:
+        rows = json.load(f)
+    assert [r["word"] for r in rows] == [f"단어{p}-{i}" for p in range(4) for i in range(3)]
+    assert rows[0]["meaning"] == "释义0"
+    # 导入完成后不留中间文件，同名输出被占用时换一个文件名
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["book.pdf", "words_ko_book.json"]
+    assert available_output(out, pdf) == str(tmp_path / "words_ko_book_2.json")
@@ -0,0 +1,81 @@
+import sqlite3
+import threading
+
+import pytest
+
+from progress_store import ProgressStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    # 后台线程基本不会自己醒来，由测试显式 flush
+    store = ProgressStore(str(tmp_path / "progress.db"), flush_interval=3600, max_cached=2)
+    yield store
+    store.close()
+
+
+def test_unflushed_records_survive_eviction(store, tmp_path):
+    for k in range(5):
+        store.save(f"user{k}", "words_ko.json", position=k + 1)
+    # 缓存上限是 2，但 5 条都还没落盘，一条也不能淘汰
+    assert len(store._cache) == 5
+    assert [store.load(f"user{k}", "words_ko.json")["position"] for k in range(5)] == [1, 2, 3, 4, 5]
+    store.flush()
+    assert len(store._cache) == 2
+    fresh = ProgressStore(str(tmp_path / "progress.db"))
+    assert fresh.load("user0", "words_ko.json")["position"] == 1
+    fresh.close()
+
+
+def test_failed_commit_is_retried(store, monkeypatch, tmp_path):
+    store.save("alice", "words_ko.json", position=3)
+    store.log_review("alice", "words_ko.json", 7, 1, ts=1.0)
+    commit = store._commit
+
+    def locked(dirty, reviews):
+        # 提交失败期间又保存了一次，重试时应写入新值
+        store.save("alice", "words_ko.json", position=4)
+        store.log_review("alice", "words_ko.json", 8, 0, ts=2.0)
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "_commit", locked)
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    monkeypatch.setattr(store, "_commit", commit)
+    assert store.history("alice", "words_ko.json") == [(8, 0, 2.0), (7, 1, 1.0)]
+    fresh = ProgressStore(str(tmp_path / "progress.db"))
+    assert fresh.load("alice", "words_ko.json")["position"] == 4
+    fresh.close()
+
+
+def test_flushes_do_not_overlap(store, monkeypatch):
+    commit = store._commit
+    entered = threading.Event()
+    release = threading.Event()
+    active = []
+
+    def slow(dirty, reviews):
+        active.append(dirty)
+        assert len(active) == 1
+        entered.set()
+        release.wait(5)
+        commit(dirty, reviews)
+        active.pop()
+
+    monkeypatch.setattr(store, "_commit", slow)
+    store.save("alice", "words_ko.json", position=1)
+    first = threading.Thread(target=store.flush)
+    first.start()
+    assert entered.wait(5)
+    store.save("bob", "words_ko.json", position=2)
+    second = threading.Thread(target=store.flush)
+    second.start()
+    second.join(0.2)
+    # 第二次 flush 等第一批提交完才开始，正在提交的记录也一直留在缓存里
+    assert second.is_alive()
+    assert ("alice", "words_ko.json") in store._flushing
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert store.flushes == 2
+    assert not active
@@ -0,0 +1,50 @@
+import random
+
+from deck import Deck
+from quiz import distractor_index, meaning_parts, parts_overlap
+
+BOOK = {
+    "第一课": [
+        {"word": "학교", "meaning": "学校"},
+        {"word": "학원", "meaning": "学校（补习班）"},
+        {"word": "교실", "meaning": "教室"},
+        {"word": "학생", "meaning": "学生"},
+        {"word": "선생님", "meaning": "老师；先生"},
+        {"word": "선생", "meaning": "先生"},
+    ],
+    "第二课": [
+        {"word": "사과", "meaning": "苹果"},
+        {"word": "바나나", "meaning": "香蕉"},
+        {"word": "포도", "meaning": "葡萄"},
+        {"word": "학교", "meaning": "学堂"},
+    ],
+}
+
+
+def test_meaning_parts():
+    assert meaning_parts("学校（补习班）；Class, 班") == {"学校", "class", "班"}
+    assert meaning_parts(None) == frozenset()
+    assert parts_overlap(meaning_parts("学校前面"), meaning_parts("学校"))
+    # 单字的包含关系不算同义
+    assert not parts_overlap(meaning_parts("班级"), meaning_parts("班"))
+
+
+def test_pick_never_offers_duplicate_meanings():
+    deck = Deck.from_raw(BOOK)
+    index = distractor_index(deck)
+    assert distractor_index(deck) is index
+    answer = 0
+    for seed in range(50):
+        chosen = index.pick(answer, unit="第一课", k=3, rng=random.Random(seed))
+        assert len(chosen) == len(set(chosen)) == 3
+        # 同一个词、和答案同义的词都不能当干扰项，干扰项之间也互不同义
+        assert answer not in chosen and 1 not in chosen and 9 not in chosen
+        assert not {4, 5} <= set(chosen)
+        parts = [meaning_parts(deck.meanings[pos]) for pos in [answer] + chosen]
+        for i, a in enumerate(parts):
+            assert not any(parts_overlap(a, b) for b in parts[i + 1:])
+
+
+def test_pick_returns_fewer_when_book_is_small():
+    deck = Deck.from_raw([{"word": "가", "meaning": "一"}, {"word": "나", "meaning": "一"}, {"word": "다", "meaning": "二"}])
+    assert distractor_index(deck).pick(0, k=3, rng=random.Random(0)) == [2]
@@ -0,0 +1,104 @@
+import gc
+import json
+import weakref
+
+import pytest
+
+import search_index
+from deck_cache import DeckCache, load_book
+from search_index import SearchIndex
+
+BOOK = {
+    "第一课": [
+        {"word": "학교", "meaning": "学校", "example": "학교에 가요."},
+        {"word": "학교 앞", "meaning": "学校前面；校门口"},
+        {"word": "학생", "meaning": "学生", "example": "그는 학교 학생이에요."},
+    ],
+    "第二课": [
+        {"word": "학교", "meaning": "学校"},
+        {"word": "친구", "meaning": "朋友", "example": "친구와 학교에 가요."},
+    ],
+}
+
+
+def write_book(tmp_path, name, raw):
+    path = str(tmp_path / name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(raw, f, ensure_ascii=False)
+    return path
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    index = SearchIndex(DeckCache())
+    index.refresh([write_book(tmp_path, "words_ko.json", BOOK)])
+    return index
+
+
+def texts(index, hits):
+    return [index.card(path, pos)["word"] for _, path, pos in hits]
+
+
+@pytest.mark.parametrize("query", ["학교", "学校前面"])
+def test_exact_word_ranks_first(index, query):
+    total, hits, truncated = index.search(query)
+    assert not truncated
+    assert total == len(hits)
+    assert texts(index, hits)[0] == {"학교": "학교", "学校前面": "학교 앞"}[query]
+
+
+def test_totals_match_scored_hits(index):
+    # 单字查询走预先算好的排序，多字查询走交集校验，总数都是真实命中数
+    for query, expected in (("학", 4), ("학교", 4), ("학교에", 2), ("없는말", 0)):
+        total, hits, _ = index.search(query, per_page=100)
+        assert total == len(hits) == expected, query
+
+
+def test_paging(index):
+    total, first, _ = index.search("학", per_page=2)
+    _, second, _ = index.search("학", page=1, per_page=2)
+    _, everything, _ = index.search("학", per_page=100)
+    assert first + second == everything[:4]
+    assert [s for s, _, _ in everything] == sorted((s for s, _, _ in everything), reverse=True)
+
+
+def test_long_query_truncates(index, monkeypatch):
+    monkeypatch.setattr(search_index, "MAX_VERIFY", 1)
+    total, hits, truncated = index.search("학교에")
+    assert truncated
+    assert total == len(hits) == 1
+
+
+def test_locate_uses_first_unit(index):
+    _, hits, _ = index.search("친구")
+    _, path, pos = hits[0]
+    assert index.locate(path, pos) == ("第二课", 1)
+    _, hits, _ = index.search("학교", per_page=1)
+    _, path, pos = hits[0]
+    assert index.locate(path, pos) == ("第一课", 0)
+
+
+def test_index_does_not_pin_decks(tmp_path, monkeypatch):
+    monkeypatch.setenv("DECK_DIR", str(tmp_path / "decks"))
+    cache = DeckCache(max_bytes=1)
+    index = SearchIndex(cache)
+    path = write_book(tmp_path, "words_ko.json", BOOK)
+    other = write_book(tmp_path, "words_fr.json", [{"word": "école", "meaning": "学校"}])
+    index.refresh([path])
+    deck = weakref.ref(load_book(cache, path))
+    index.refresh([path, other])
+    gc.collect()
+    # 第二本书把第一本挤出缓存后，索引不再引用它；显示命中时重新加载
+    assert deck() is None
+    _, hits, _ = index.search("친구")
+    assert index.card(path, hits[0][2])["meaning"] == "朋友"
+
+
+def test_refresh_rebuilds_changed_book(index, tmp_path):
+    path = str(tmp_path / "words_ko.json")
+    assert index.refresh([path]) == []
+    write_book(tmp_path, "words_ko.json", {"第一课": [{"word": "사과", "meaning": "苹果"}]})
+    assert index.refresh([path]) == [path]
+    assert index.search("학교")[0] == 0
+    assert index.search("苹果")[0] == 1
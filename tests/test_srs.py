@@ -0,0 +1,67 @@
+import pytest
+
+from deck import Deck
+from srs import (CARD_BYTES, DAY_MINUTES, GRADE_AGAIN, GRADE_GOOD, MIN_EASE, RELEARN_MINUTES, ReviewQueue,
+                 Scheduler)
+
+NOW = 1_700_000_000
+
+
+def test_intervals_follow_sm2():
+    sched = Scheduler(3)
+    assert sched.is_new(0)
+    assert sched.review(0, GRADE_GOOD, now=NOW) == NOW + DAY_MINUTES * 60
+    assert sched.review(0, GRADE_GOOD, now=NOW) == NOW + 6 * DAY_MINUTES * 60
+    third = sched.review(0, GRADE_GOOD, now=NOW)
+    assert third == NOW + 6 * DAY_MINUTES * 60 * sched.ease[0] // 1000
+    # 答错回到短间隔重学，难度系数下降但不低于下限
+    assert sched.review(0, GRADE_AGAIN, now=NOW) == NOW + RELEARN_MINUTES * 60
+    for _ in range(20):
+        sched.review(1, 0, now=NOW)
+    assert sched.ease[1] == MIN_EASE
+    assert sched.stats(now=NOW + 3600) == {"cards": 3, "reviewed": 2, "due": 2, "lapses": 21}
+
+
+def test_bytes_round_trip():
+    sched = Scheduler(4)
+    sched.review(1, GRADE_GOOD, now=NOW)
+    sched.review(3, GRADE_AGAIN, now=NOW)
+    data = sched.to_bytes()
+    assert len(data) == CARD_BYTES * 4
+    restored = Scheduler.from_bytes(data, 4)
+    for name in ("ease", "interval", "reps", "lapses", "due"):
+        assert getattr(restored, name) == getattr(sched, name)
+    assert restored.reviewed == 2
+    with pytest.raises(ValueError):
+        Scheduler.from_bytes(data, 5)
+
+
+def make_queue(n=6):
+    deck = Deck.from_raw([{"word": f"w{i}", "meaning": f"m{i}"} for i in range(n)])
+    return ReviewQueue(Scheduler(len(deck)), deck.select(deck.unit_names))
+
+
+def test_queue_order_due_then_new_then_early():
+    queue = make_queue()
+    queue.record(0, GRADE_AGAIN, now=NOW)
+    queue.record(1, GRADE_GOOD, now=NOW)
+    queue.record(2, GRADE_AGAIN, now=NOW + 60)
+    # 还没有到期的卡时按顺序出新卡，跳过已复习过的
+    assert queue.next_index(now=NOW) == 3
+    later = NOW + RELEARN_MINUTES * 60 + 60
+    assert queue.due_count(now=later) == 2
+    # 到期卡优先，最早到期的先出；exclude 是当前卡，不会连续出两次
+    assert queue.next_index(now=later) == 0
+    assert queue.next_index(exclude=0, now=later) == 2
+    assert [queue.next_index(now=NOW) for _ in range(2)] == [4, 5]
+    # 新卡也用完后提前复习最早到期的卡
+    assert queue.next_index(now=NOW) == 0
+
+
+def test_rereview_replaces_stale_heap_entry():
+    queue = make_queue()
+    queue.record(0, GRADE_AGAIN, now=NOW)
+    queue.record(0, GRADE_GOOD, now=NOW)
+    assert queue.due_count(now=NOW + RELEARN_MINUTES * 60) == 0
+    restored = ReviewQueue(Scheduler.from_bytes(queue.scheduler.to_bytes(), 6), queue.view)
+    assert restored.due_count(now=NOW + DAY_MINUTES * 60) == 1
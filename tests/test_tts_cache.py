@@ -0,0 +1,91 @@
+import threading
+
+from tts_cache import AudioCache, AudioPrefetcher, StubBackend
+
+
+def test_evicts_least_recently_used(tmp_path):
+    backend = StubBackend()
+    size = len(backend.synthesize("가", "ko"))
+    cache = AudioCache(str(tmp_path), max_bytes=size * 2, backend=backend)
+    cache.get("가", "ko")
+    cache.get("나", "ko")
+    # 读一次“가”，它就不再是最旧的
+    assert cache.lookup("가", "ko") is not None
+    cache.get("다", "ko")
+    assert cache.contains("가", "ko")
+    assert not cache.contains("나", "ko")
+    assert cache.contains("다", "ko")
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_index_survives_restart(tmp_path):
+    AudioCache(str(tmp_path), backend=StubBackend()).get("가", "ko")
+    backend = StubBackend()
+    cache = AudioCache(str(tmp_path), backend=backend)
+    assert cache.stats()["files"] == 1
+    assert cache.get("가", "ko") is not None
+    assert backend.calls == 0
+
+
+def test_concurrent_misses_synthesize_once(tmp_path):
+    backend = StubBackend(delay=0.1)
+    cache = AudioCache(str(tmp_path), backend=backend)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("안녕", "ko"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert backend.calls == 1
+    assert len(set(results)) == 1 and results[0]
+    assert cache.stats()["misses"] == 1
+
+
+def test_lookup_does_not_count_hits(tmp_path):
+    cache = AudioCache(str(tmp_path), backend=StubBackend())
+    cache.get("가", "ko")
+    # 渲染时给卡片附带发音只是查缓存，不能把命中率抬高
+    for _ in range(5):
+        assert cache.lookup("가", "ko") is not None
+    assert cache.lookup("나", "ko") is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 1)
+    cache.get("가", "ko")
+    assert cache.stats()["hits"] == 1
+
+
+class BlockingBackend(StubBackend):
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def synthesize(self, text, lang_code):
+        self.started.set()
+        self.release.wait(5)
+        return super().synthesize(text, lang_code)
+
+
+def test_prefetch_cancels_queued_work_on_context_change(tmp_path):
+    backend = BlockingBackend()
+    cache = AudioCache(str(tmp_path), backend=backend)
+    prefetcher = AudioPrefetcher(cache, max_workers=1)
+    try:
+        first = prefetcher.prefetch("s1", "unit1", ["가", "나", "다"], "ko")
+        assert backend.started.wait(5)
+        assert prefetcher.pending("s1") == 3
+        # 同一上下文再次预取：已排队的任务原样保留，不重复提交
+        assert prefetcher.prefetch("s1", "unit1", ["가", "나", "다"], "ko") == first
+        # 换单元后，还没开始的旧任务被取消；正在合成的那个无法取消，但不再计入该会话
+        second = prefetcher.prefetch("s1", "unit2", ["라"], "ko")
+        assert all(f.cancelled() for f in first[1:])
+        backend.release.set()
+        second[0].result(5)
+        first[0].result(5)
+        assert backend.calls == 2
+        assert cache.contains("라", "ko") and not cache.contains("나", "ko")
+        assert prefetcher.pending("s1") == 0
+    finally:
+        backend.release.set()
+        prefetcher.shutdown()
@@ -0,0 +1,48 @@
+import io
+import json
+
+import pytest
+
+from upload_loader import UploadError, load_stream
+
+
+def load(text, read_size=64):
+    return load_stream(io.BytesIO(text.encode("utf-8")), read_size=read_size)
+
+
+def test_bad_entries_are_skipped_with_positions():
+    text = ('{"第一课": [{"word": "a", "meaning": "b"},\n {"word": "c"}],\n'
+            ' "第二课": [\n 3, {"word": "d", "meaning": "e"}]}')
+    deck = load(text)
+    assert list(deck.words) == ["a", "d"]
+    errors = [(e.index, e.line, e.unit, e.message) for e in deck.load_report.errors]
+    assert errors == [(2, 2, "第一课", "缺少 meaning"), (3, 4, "第二课", "词条应为对象，实际是 int")]
+
+
+def test_syntax_error_reports_line():
+    with pytest.raises(UploadError) as info:
+        load('[\n{"word": "a", "meaning": "b"},\n{"word": "c" "meaning": "d"}\n]')
+    assert info.value.line == 3
+    assert "语法错误" in str(info.value)
+
+
+def test_syntax_error_is_not_reported_as_oversized_entry():
+    entries = [{"word": f"w{i}", "meaning": "m"} for i in range(20000)]
+    text = '[{"word": "x" "meaning": "y"},\n' + json.dumps(entries)[1:]
+    with pytest.raises(UploadError) as info:
+        load(text, read_size=1 << 16)
+    assert "语法错误" in str(info.value)
+    assert info.value.line == 1
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 4096])
+def test_entries_split_across_reads(read_size):
+    entries = [{"word": f"단어{i}", "meaning": "释义", "example": "예문 " * i} for i in range(50)]
+    deck = load(json.dumps(entries, ensure_ascii=False), read_size=read_size)
+    assert len(deck) == 50
+    assert deck.load_report.error_count == 0
+
+
+def test_not_utf8():
+    with pytest.raises(UploadError):
+        load_stream(io.BytesIO('[{"word": "가"}]'.encode("euc-kr")))
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from fileutil import atomic_write
+
+# --- 发音缓存 ---
+# gTTS 每次都要走网络。这里把生成的 mp3 按 (语言, 规范化文本) 的哈希存到磁盘，
+# 所有会话共享；总大小超过上限时按最近使用时间淘汰。
+
+
+def normalize_text(text):
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+
+def audio_key(text, lang_code):
+    return hashlib.sha1(f"{lang_code}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class GTTSBackend:
+    def synthesize(self, text, lang_code):
+        from gtts import gTTS
+        fp = BytesIO()
+        gTTS(text=text, lang=lang_code).write_to_fp(fp)
+        return fp.getvalue()
+
+
+class StubBackend:
+    """离线后端：返回确定性的假音频，记录调用次数，可模拟网络延迟。"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize(self, text, lang_code):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return b"ID3STUB" + f"{lang_code}:{text}".encode("utf-8")
+
+
+class AudioCache:
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024, backend=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backend = backend or GTTSBackend()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        # key -> 文件大小，按最近使用排序（最旧的在前）
+        self._index = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        found = []
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".mp3"):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._index[key] = size
+            self.current_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".mp3")
+
+    def contains(self, text, lang_code):
+        return os.path.exists(self._path(audio_key(text, lang_code)))
+
+    def lookup(self, text, lang_code):
+        """只查缓存，不触发合成；未命中返回 None。
+
+        界面每次渲染都会用它给卡片带上已有的发音，所以不计入命中率，命中只在 get 里统计。
+        """
+        key = audio_key(text, lang_code)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            else:
+                # 其他进程写入的文件
+                self._index[key] = len(data)
+                self.current_bytes += len(data)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def get(self, text, lang_code):
+        text = normalize_text(text)
+        if not text:
+            return None
+        data = self.lookup(text, lang_code)
+        if data is not None:
+            self._hit()
+            return data
+        key = audio_key(text, lang_code)
+        # 同一段文本只合成一次，并发请求等待第一个结果
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                data = self.lookup(text, lang_code)
+                if data is not None:
+                    self._hit()
+                    return data
+                with self._lock:
+                    self.misses += 1
+                data = self.backend.synthesize(text, lang_code)
+                if data:
+                    self._write(key, data)
+                return data
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    def _hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def _write(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 原子替换，避免其他会话读到半个文件
+        atomic_write(path, data)
+        with self._lock:
+            self.current_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self.current_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"files": len(self._index), "bytes": self.current_bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+# --- 后台预取 ---
+# 当前卡片变化时，用有限大小的线程池提前为后面几个词生成发音并写入缓存。
+# 每个会话只保留最近一次的预取任务：换书/换单元后，尚未开始的旧任务会被取消。
+
+
+class AudioPrefetcher:
+    def __init__(self, cache, max_workers=4, max_owners=1024):
+        self.cache = cache
+        self.max_owners = max_owners
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="audio-prefetch")
+        self._lock = threading.Lock()
+        # owner -> (context, {(text, lang): future})
+        self._owners = {}
+
+    def _run(self, text, lang_code):
+        try:
+            self.cache.get(text, lang_code)
+        except Exception:
+            # 预取失败不影响界面，用户点击发音时会再次尝试并提示错误
+            pass
+
+    def prefetch(self, owner, context, texts, lang_code):
+        """owner 标识会话，context 变化（换书/换单元）时取消该会话之前排队的任务。"""
+        wanted = []
+        for text in texts:
+            text = normalize_text(text) if text else ""
+            if text and (text, lang_code) not in wanted:
+                wanted.append((text, lang_code))
+        with self._lock:
+            old_context, futures = self._owners.get(owner, (None, {}))
+            kept = {}
+            for item, future in futures.items():
+                if old_context == context and item in wanted and not future.done():
+                    kept[item] = future
+                else:
+                    future.cancel()
+            for item in wanted:
+                if item not in kept and not self.cache.contains(*item):
+                    kept[item] = self._executor.submit(self._run, *item)
+            self._owners[owner] = (context, kept)
+            if len(self._owners) > self.max_owners:
+                self._prune()
+        return list(kept.values())
+
+    def _prune(self):
+        for owner, (_, futures) in list(self._owners.items()):
+            if all(f.done() for f in futures.values()):
+                del self._owners[owner]
+
+    def cancel(self, owner):
+        with self._lock:
+            _, futures = self._owners.pop(owner, (None, {}))
+            for future in futures.values():
+                future.cancel()
+
+    def pending(self, owner):
+        with self._lock:
+            _, futures = self._owners.get(owner, (None, {}))
+            return sum(1 for f in futures.values() if not f.done())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,264 @@
+import argparse
+import codecs
+import json
+import re
+import sys
+from array import array
+
+from deck import CHUNK_SIZE, Deck, _intern
+
+# --- 上传词库的流式加载 ---
+# 按块读取上传的 JSON，每次只解码一个词条，校验后直接写进列式 Deck，
+# 不生成整份 dict 列表。解析缓冲区只保留当前词条附近的文本，
+# 100 MB 的社区词表也只占“最终 Deck + 一个读块”的内存。
+# 每个坏词条记下序号、行号和原因后跳过；JSON 语法错误才终止加载。
+
+READ_SIZE = 64 * 1024
+MAX_ENTRY_CHARS = 1 << 20
+MAX_ERRORS = 100
+REQUIRED = ("word", "meaning")
+OPTIONAL = ("example", "example_cn")
+_WS = re.compile(r"[ \t\r\n]*")
+
+
+class UploadError(ValueError):
+    """无法继续解析的错误（JSON 语法错误、顶层结构不对等）。"""
+
+    def __init__(self, message, line=None):
+        self.line = line
+        super().__init__(f"第 {line} 行: {message}" if line else message)
+
+
+class EntryError:
+    def __init__(self, index, line, unit, message):
+        self.index = index    # 词条在文件中的序号，从 1 开始
+        self.line = line
+        self.unit = unit
+        self.message = message
+
+    def __str__(self):
+        where = f"第 {self.index} 条（第 {self.line} 行"
+        where += f"，{self.unit}）" if self.unit else "）"
+        return f"{where}: {self.message}"
+
+
+class LoadReport:
+    def __init__(self):
+        self.entries_ok = 0
+        self.error_count = 0
+        # 只保留前 MAX_ERRORS 条明细，坏文件再大也不会撑爆内存
+        self.errors = []
+
+    def add_error(self, error):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(error)
+
+    def to_dict(self):
+        return {"entries_ok": self.entries_ok, "error_count": self.error_count,
+                "errors": [{"index": e.index, "line": e.line, "unit": e.unit, "message": e.message}
+                           for e in self.errors]}
+
+
+def validate_entry(value):
+    """返回 (单词, 释义, 例句, 例句翻译)；不合格时抛出 ValueError 说明原因。"""
+    if not isinstance(value, dict):
+        raise ValueError(f"词条应为对象，实际是 {type(value).__name__}")
+    row = []
+    for field in REQUIRED:
+        text = value.get(field)
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"缺少 {field}" if text is None else f"{field} 应为非空字符串")
+        row.append(text)
+    for field in OPTIONAL:
+        text = value.get(field, "")
+        if text is None:
+            text = ""
+        if not isinstance(text, str):
+            raise ValueError(f"{field} 应为字符串")
+        row.append(text)
+    return row
+
+
+class _Reader:
+    """在按块读入的文本上做增量 JSON 解码，记录行号。"""
+
+    def __init__(self, stream, read_size=READ_SIZE):
+        self.stream = stream
+        self.read_size = read_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.line = 1
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.read_size)
+        try:
+            text = self.decoder.decode(chunk or b"", final=not chunk)
+        except UnicodeDecodeError:
+            raise UploadError("文件不是 UTF-8 编码", self.line)
+        if not chunk:
+            self.eof = True
+        # 丢掉已经消费的部分，缓冲区只留未解析的尾巴
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def _advance(self, end):
+        if end > self.pos:
+            self.line += self.buf.count("\n", self.pos, end)
+            self.pos = end
+
+    def peek(self):
+        """跳过空白，返回下一个字符；文件结束返回空串。"""
+        while True:
+            self._advance(_WS.match(self.buf, self.pos).end())
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars):
+        c = self.peek()
+        if not c or c not in chars:
+            found = repr(c) if c else "文件结尾"
+            raise UploadError(f"应为 {' 或 '.join(repr(ch) for ch in chars)}，实际是 {found}", self.line)
+        self._advance(self.pos + 1)
+        return c
+
+    def value(self):
+        """解码一个完整的 JSON 值，返回 (值, 起始行号)。"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # 只有出错位置在缓冲区末尾（或字符串没闭合）才可能是值被读块切开，其余是真正的语法错误
+                if self.eof or not ("Unterminated" in e.msg or e.pos + 6 >= len(self.buf)):
+                    raise UploadError(f"JSON 语法错误: {e.msg}", self.line + self.buf.count("\n", self.pos, e.pos))
+                end = None
+            # 值恰好停在缓冲区末尾时（如被切开的数字）要再读一块确认
+            if end is not None and (end < len(self.buf) or self.eof):
+                line = self.line
+                self._advance(end)
+                return value, line
+            if len(self.buf) - self.pos > MAX_ENTRY_CHARS:
+                raise UploadError("单个词条过大", self.line)
+            self._fill()
+
+
+def iter_entries(stream, read_size=READ_SIZE):
+    """逐个产出 (单元名或 None, 行号, 原始词条)。
+
+    顶层可以是词条列表，也可以是 {单元名: [词条...]}，与 Deck.from_raw 一致。
+    """
+    reader = _Reader(stream, read_size)
+    top = reader.expect("[{")
+    if top == "[":
+        yield from _iter_array(reader, None)
+    else:
+        if reader.peek() == "}":
+            reader.expect("}")
+        else:
+            while True:
+                name, line = reader.value()
+                if not isinstance(name, str):
+                    raise UploadError("单元名应为字符串", line)
+                reader.expect(":")
+                if reader.peek() != "[":
+                    raise UploadError(f"单元 {name} 不是词条列表", reader.line)
+                reader.expect("[")
+                yield from _iter_array(reader, name)
+                if reader.expect(",}") == "}":
+                    break
+    if reader.peek():
+        raise UploadError("JSON 结束后还有多余内容", reader.line)
+
+
+def _iter_array(reader, unit):
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    while True:
+        value, line = reader.value()
+        yield unit, line, value
+        if reader.expect(",]") == "]":
+            return
+
+
+def load_stream(stream, chunk_size=CHUNK_SIZE, read_size=READ_SIZE):
+    """流式构建 Deck，deck.load_report 记录逐条校验结果。"""
+    columns = ([], [], [], [])
+    unit_names = []
+    unit_offsets = array("I", [0])
+    report = LoadReport()
+    current_unit = None
+    index = 0
+    for unit, line, value in iter_entries(stream, read_size):
+        index += 1
+        try:
+            row = validate_entry(value)
+        except ValueError as e:
+            report.add_error(EntryError(index, line, unit, str(e)))
+            continue
+        if unit is not None and unit != current_unit:
+            if current_unit is not None:
+                unit_names.append(current_unit)
+                unit_offsets.append(len(columns[0]))
+            current_unit = unit
+        for column, text in zip(columns, row):
+            column.append(_intern(text))
+        report.entries_ok += 1
+        # 列表格式按有效词条每 chunk_size 个切一个单元
+        if unit is None and len(columns[0]) % chunk_size == 0:
+            _close_chunk(unit_names, unit_offsets, len(columns[0]))
+    total = len(columns[0])
+    if current_unit is not None:
+        unit_names.append(current_unit)
+        unit_offsets.append(total)
+    elif total > unit_offsets[-1]:
+        _close_chunk(unit_names, unit_offsets, total)
+    if not total:
+        raise UploadError(f"没有有效词条（{report.error_count} 条有错误）" if report.error_count else "没有词条")
+    deck = Deck(*columns, unit_names, unit_offsets)
+    deck.load_report = report
+    return deck
+
+
+def _close_chunk(unit_names, unit_offsets, end):
+    start = unit_offsets[-1]
+    unit_names.append(f"单元 {len(unit_names) + 1} ({start + 1}-{end})")
+    unit_offsets.append(end)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按上传时的规则校验词库 JSON，列出有问题的词条")
+    parser.add_argument("book")
+    parser.add_argument("--json", action="store_true", help="输出 JSON 格式的校验结果")
+    args = parser.parse_args(argv)
+
+    with open(args.book, "rb") as f:
+        try:
+            deck = load_stream(f)
+        except UploadError as e:
+            print(e, file=sys.stderr)
+            return 1
+    report = deck.load_report
+    if args.json:
+        json.dump(dict(report.to_dict(), units=len(deck.unit_names)), sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print(f"{report.entries_ok} 条有效，{report.error_count} 条有错误，{len(deck.unit_names)} 个单元")
+        for error in report.errors:
+            print(f"  {error}")
+        if report.error_count > len(report.errors):
+            print(f"  ……另有 {report.error_count - len(report.errors)} 条未列出")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())